@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Contact sheet / atlas export.
+Renders every entry of a manifest as a thumbnail tile into one atlas image (or one
+multi-frame file) with a single encode and a JSON index of where each cover is.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from PIL import Image
+
+from batch import assign_sample_indexes, load_manifest, normalize_entry
+from encoders import get_encoder
+from image_generator import ImageGenerator
+from layout import shrink
+from workers import get_generator, init_worker, initializer
+
+# Multi-frame containers by file extension
+FRAME_FORMATS = {
+    '.tif': ('TIFF', {'compression': 'tiff_deflate'}),
+    '.tiff': ('TIFF', {'compression': 'tiff_deflate'}),
+    '.webp': ('WEBP', {'lossless': True, 'method': 4}),
+    '.png': ('PNG', {'compress_level': 6}),
+}
+
+def tile_size(width, height, scale):
+    """Return the thumbnail size of a canvas at a scale"""
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render_tile(task):
+    """Render one manifest entry straight to a tile, returning (index, ok, tile or error)
+
+    The template is laid out and drawn at tile scale, never at full size.
+    """
+    index, entry, sample_index, scale, size = task
+    generator = get_generator()
+    try:
+        entry = normalize_entry(entry)
+        params = entry['params']
+        if generator.sampler is not None and generator.uses_data(entry['generator']):
+            params['sample_index'] = sample_index
+        cover = generator.generate(entry['generator'], entry['theme'], output='inputs', **params)
+        image = generator.render_scaled(cover['kind'], cover['theme'], scale, **cover['inputs'])
+        # Only resized when the sheet's canvas is not the generator's
+        return index, True, shrink(image, size)
+    except Exception as e:
+        return index, False, f"{type(e).__name__}: {e}"
+
+
+def render_tiles(entries, scale, size, workers=1, seed=None):
+    """Yield (index, ok, tile or error) for every entry, in manifest order"""
+    tasks = [(index, entry, sample_index, scale, size) for index, (entry, sample_index)
+             in enumerate(zip(entries, assign_sample_indexes(entries)))]
+    if workers == 1:
+        init_worker(seed=seed)
+        yield from map(render_tile, tasks)
+        return
+    # Only thumbnails cross the process boundary, never full-size covers
+    with multiprocessing.Pool(workers, initializer=initializer(seed=seed)) as pool:
+        yield from pool.imap(render_tile, tasks)
+
+
+def describe_entry(entry):
+    """Return the manifest fields of an entry for the index, or the raw entry if invalid"""
+    try:
+        return normalize_entry(entry)
+    except ValueError:
+        return {'entry': entry}
+
+
+def build_atlas(entries, scale=0.25, columns=None, padding=0, background=(0, 0, 0),
+                workers=1, seed=None, canvas=(1500, 600)):
+    """Render entries into one tiled image, returning (atlas, index)
+
+    Tiles are placed in manifest order, left to right and top to bottom; failed entries
+    leave their slot empty and are listed in the index with their error.
+    """
+    size = tile_size(canvas[0], canvas[1], scale)
+    count = max(len(entries), 1)
+    if columns is None:
+        # Roughly square sheets are the easiest to preview
+        columns = max(1, math.ceil(math.sqrt(count * size[1] / size[0])))
+    rows = math.ceil(count / columns)
+    atlas = Image.new('RGB', (columns * size[0] + (columns + 1) * padding,
+                              rows * size[1] + (rows + 1) * padding), background)
+
+    tiles = []
+    failed = []
+    for index, ok, result in render_tiles(entries, scale, size, workers, seed):
+        if not ok:
+            failed.append({'index': index, 'error': result})
+            continue
+        row, column = divmod(index, columns)
+        x = padding + column * (size[0] + padding)
+        y = padding + row * (size[1] + padding)
+        atlas.paste(result, (x, y))
+        tiles.append(dict(describe_entry(entries[index]), index=index,
+                          x=x, y=y, width=size[0], height=size[1]))
+
+    index = {
+        'type': 'atlas',
+        'tile_width': size[0],
+        'tile_height': size[1],
+        'scale': scale,
+        'columns': columns,
+        'rows': rows,
+        'padding': padding,
+        'tiles': tiles,
+        'failed': failed,
+    }
+    return atlas, index
+
+
+def build_frames(entries, scale=0.25, workers=1, seed=None, canvas=(1500, 600)):
+    """Render entries as thumbnail frames, returning (frames, index)"""
+    size = tile_size(canvas[0], canvas[1], scale)
+    frames = []
+    tiles = []
+    failed = []
+    for index, ok, result in render_tiles(entries, scale, size, workers, seed):
+        if not ok:
+            failed.append({'index': index, 'error': result})
+            continue
+        tiles.append(dict(describe_entry(entries[index]), index=index, frame=len(frames),
+                          width=size[0], height=size[1]))
+        frames.append(result)
+    index = {
+        'type': 'frames',
+        'tile_width': size[0],
+        'tile_height': size[1],
+        'scale': scale,
+        'tiles': tiles,
+        'failed': failed,
+    }
+    return frames, index
+
+
+def index_path(path):
+    """Return where the JSON index of an atlas or frame file is written"""
+    return os.path.splitext(path)[0] + '.json'
+
+
+def write_index(index, path):
+    """Write the JSON index next to its image"""
+    index = dict(index, image=os.path.basename(path))
+    with open(index_path(path), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, default=str)
+    return index_path(path)
+
+
+def save_atlas(atlas, index, path, encoder='png'):
+    """Encode the atlas once and write it with its index"""
+    with open(path, 'wb') as f:
+        get_encoder(encoder).encode(atlas, f)
+    return write_index(index, path)
+
+
+def save_frames(frames, index, path):
+    """Write every frame into one multi-frame TIFF, WebP or APNG file with its index"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FRAME_FORMATS:
+        raise ValueError(f"Multi-frame output must be one of {', '.join(FRAME_FORMATS)}")
+    if not frames:
+        raise ValueError("No covers were rendered")
+    format, options = FRAME_FORMATS[extension]
+    frames[0].save(path, format=format, save_all=True, append_images=frames[1:], **options)
+    return write_index(index, path)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render a manifest into one contact sheet.")
+    parser.add_argument('manifest', help="JSONL or CSV manifest of covers to render")
+    parser.add_argument('-o', '--output', default=None,
+                        help="atlas file (default: output/atlas.png, or .tif with --frames)")
+    parser.add_argument('--scale', type=float, default=0.25,
+                        help="thumbnail scale of the 1500x600 canvas (default: 0.25)")
+    parser.add_argument('--columns', type=int, default=None,
+                        help="tiles per row (default: a roughly square sheet)")
+    parser.add_argument('--padding', type=int, default=0, help="pixels between tiles")
+    parser.add_argument('--frames', action='store_true',
+                        help="write a multi-frame TIFF/WebP/APNG instead of a tiled image")
+    parser.add_argument('--encoder', default='png',
+                        help="encoder preset for the atlas image (default: png)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="worker processes rendering tiles (default: 1)")
+    parser.add_argument('--seed', help="seed for reproducible quote/book picks without repeats")
+    args = parser.parse_args(argv)
+
+    entries = load_manifest(args.manifest)
+    output = args.output
+    claimed = None
+    if output is None:
+        generator = ImageGenerator(verbose=False)
+        extension = '.tif' if args.frames else get_encoder(args.encoder).extension
+        claimed = generator.get_unique_filename('atlas' + extension)
+        output = os.path.join(generator.output_dir, claimed)
+    print(f"🎨 Rendering {len(entries)} covers into {output}...")
+
+    start = time.perf_counter()
+    try:
+        if args.frames:
+            frames, index = build_frames(entries, args.scale, args.workers, args.seed)
+            json_path = save_frames(frames, index, output)
+        else:
+            atlas, index = build_atlas(entries, args.scale, args.columns, args.padding,
+                                       workers=args.workers, seed=args.seed)
+            json_path = save_atlas(atlas, index, output, args.encoder)
+    except BaseException:
+        if claimed is not None:
+            generator.namer.release(claimed)
+        raise
+    total = time.perf_counter() - start
+
+    for failure in index['failed']:
+        print(f"❌ [{failure['index'] + 1}] {failure['error']}")
+    print(f"✓ Atlas saved: {output}")
+    print(f"✓ Index saved: {json_path}")
+    print(f"\n📊 {len(index['tiles'])}/{len(entries)} covers in {total:.2f}s "
+          f"({os.path.getsize(output) / 1024:.0f} KB)")
+    return 1 if index['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Headless batch renderer.
+Renders every entry of a JSONL or CSV manifest across a pool of worker processes.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from image_generator import ImageGenerator, cover_kind
+from params import parse_value
+from workers import get_generator, init_worker, initializer
+
+
+def normalize_entry(entry):
+    """Turn a manifest row into {'generator', 'theme', 'params'}
+
+    'generate_stoic_quote' and 'stoic_quote' name the same cover, so the generator is
+    normalized here and seeded runs draw both from one stream.
+    """
+    entry = dict(entry)
+    generator = entry.pop('generator', None)
+    if not generator:
+        raise ValueError("Manifest entry is missing 'generator'")
+    theme = entry.pop('theme', None) or None
+    params = entry.pop('params', None) or {}
+    # Any remaining keys are treated as generator parameters
+    params.update(entry)
+    return {'generator': cover_kind(generator), 'theme': theme, 'params': params}
+
+
+def load_manifest(path, manifest_format=None):
+    """Load manifest entries from a JSONL or CSV file"""
+    if manifest_format is None:
+        manifest_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    entries = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if manifest_format == 'csv':
+            for row in csv.DictReader(f):
+                entries.append({key: parse_value(value) for key, value in row.items()
+                                if key and value not in (None, '')})
+        else:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    entries.append(json.loads(line))
+    return entries
+
+
+def assign_sample_indexes(entries):
+    """Give every entry its position within the stream of identical requests
+
+    With a seed, the n-th "stoic_quote" entry always gets the n-th quote of the seeded
+    sequence, whichever worker renders it, so runs are reproducible and don't repeat.
+    """
+    counters = {}
+    indexes = []
+    for entry in entries:
+        try:
+            normalized = normalize_entry(entry)
+        except ValueError:
+            indexes.append(None)
+            continue
+        stream = (normalized['generator'],
+                  json.dumps(normalized['params'], sort_keys=True, default=str))
+        indexes.append(counters.get(stream, 0))
+        counters[stream] = indexes[-1] + 1
+    return indexes
+
+
+def expand_themes(entries, themes):
+    """Repeat every entry once per theme, returning (entries, sample indexes)
+
+    Copies of an entry share its sample index, so with a seed every theme renders the
+    same quote or book and only the colors change.
+    """
+    indexes = assign_sample_indexes(entries)
+    if not themes:
+        return entries, indexes
+    expanded = []
+    expanded_indexes = []
+    for entry, sample_index in zip(entries, indexes):
+        for theme in themes:
+            expanded.append(dict(entry, theme=theme))
+            expanded_indexes.append(sample_index)
+    return expanded, expanded_indexes
+
+
+def render_entry(task):
+    """Render one manifest entry, returning (index, ok, result, seconds)"""
+    index, entry, sample_index = task
+    generator = get_generator()
+    start = time.perf_counter()
+    try:
+        entry = normalize_entry(entry)
+        params = entry['params']
+        if generator.sampler is not None and generator.uses_data(entry['generator']):
+            params['sample_index'] = sample_index
+        result = generator.generate(entry['generator'], entry['theme'], **params)
+        return index, True, result, time.perf_counter() - start
+    except Exception as e:
+        return index, False, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+def run_batch(entries, workers=None, chunksize=1, on_result=None, naming='counter',
+              cache=False, encoder='png', seed=None, trace=None, themes=None):
+    """Render entries across a process pool, yielding results in manifest order
+
+    With themes, every entry is rendered once in each theme (theme-major within an entry).
+    """
+    entries, indexes = expand_themes(entries, themes)
+    tasks = [(index, entry, sample_index) for index, (entry, sample_index)
+             in enumerate(zip(entries, indexes))]
+    workers = workers or os.cpu_count() or 1
+    # Every worker appends its spans and events to the same JSON-lines trace file
+    options = {'naming': naming, 'render_cache': cache, 'encoder': encoder, 'seed': seed,
+               'trace': trace}
+
+    if workers == 1:
+        init_worker(**options)
+        for result in map(render_entry, tasks):
+            if on_result:
+                on_result(result)
+            yield result
+        return
+
+    with multiprocessing.Pool(workers, initializer=initializer(**options)) as pool:
+        for result in pool.imap(render_entry, tasks, chunksize=chunksize):
+            if on_result:
+                on_result(result)
+            yield result
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render Notion covers from a manifest file.")
+    parser.add_argument('manifest', help="JSONL or CSV manifest of covers to render")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default=None,
+                        help="manifest format (default: guessed from the file extension)")
+    parser.add_argument('--chunksize', type=int, default=1,
+                        help="entries sent to a worker at a time")
+    parser.add_argument('--naming', choices=['counter', 'hash'], default='counter',
+                        help="name outputs with a counter suffix or by content hash")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse identical renders from the on-disk render cache")
+    parser.add_argument('--encoder', default='png',
+                        help="encoder preset, e.g. png, png-fast, png-palette, webp (default: png)")
+    parser.add_argument('--seed',
+                        help="seed for reproducible quote/book picks without repeats")
+    parser.add_argument('--trace',
+                        help="append per-stage spans and events as JSON lines to this file")
+    parser.add_argument('--themes', nargs='+',
+                        help="render every entry in each of these themes ('all' for every "
+                             "theme in themes.json)")
+    args = parser.parse_args(argv)
+
+    entries = load_manifest(args.manifest, args.format)
+    themes = args.themes
+    if themes == ['all']:
+        themes = ImageGenerator(verbose=False).themes.names()
+    total_covers = len(entries) * len(themes) if themes else len(entries)
+    print(f"🎨 Rendering {total_covers} covers...")
+
+    failed = 0
+    start = time.perf_counter()
+    results = run_batch(entries, args.workers, args.chunksize,
+                        naming=args.naming, cache=args.cache, encoder=args.encoder,
+                        seed=args.seed, trace=args.trace, themes=themes)
+    for index, ok, result, elapsed in results:
+        if ok:
+            print(f"✓ [{index + 1}] {result} ({elapsed * 1000:.0f} ms)")
+        else:
+            failed += 1
+            print(f"❌ [{index + 1}] {result}")
+    total = time.perf_counter() - start
+
+    rendered = total_covers - failed
+    rate = rendered / total if total > 0 else 0.0
+    print(f"\n📊 Rendered {rendered}/{total_covers} covers in {total:.2f}s "
+          f"({rate:.1f} covers/s), {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
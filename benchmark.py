@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite.
+Times every cover type end to end and stage by stage, measures batch throughput at
+several worker counts, and compares the results with a saved baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import PIL
+from PIL import Image
+
+from batch import run_batch
+from font_cache import FontRegistry
+from gradients import GradientEngine
+from image_generator import ImageGenerator
+from layout import RenderPlan, TextElement
+
+# Fixed inputs for each cover type, so runs are comparable across changes
+BENCH_CASES = {
+    'stoic_quote': {'theme': 'dark', 'seed': 1},
+    'anime_quote': {'seed': 1},
+    'book_recommendation': {'theme': 'light', 'seed': 1},
+    'year_progress': {'theme': 'light', 'now': '2026-07-01'},
+    'life_progress': {'theme': 'dark', 'birth_year': 1990, 'life_expectancy': 80},
+    'period_progress': {'theme': 'light', 'period': 'month', 'now': '2026-07-15'},
+    'motivational_text': {'theme': 'dark', 'text': "The obstacle is the way."},
+}
+
+# Cold starts timed in a fresh interpreter; 'python' is the floor nothing can beat
+STARTUP_CASES = {
+    'python': ['-c', 'pass'],
+    'import_generator': ['-c', 'import image_generator'],
+    'cli_menu': ['-c', 'import main'],
+    'cli_one_shot': ['main.py', '--generate', 'motivational_text', '--set', 'text=Hi',
+                     '--stdout'],
+}
+
+# The startup case --startup-target-ms is checked against
+STARTUP_TARGET_CASE = 'cli_one_shot'
+
+# Metrics where a bigger number is better; everything else is a duration
+HIGHER_IS_BETTER = ('covers_per_s',)
+
+
+def time_calls(function, repeat=10, warmup=1):
+    """Call function repeatedly and return timing statistics in milliseconds"""
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+    }
+
+
+def split_case(case):
+    """Separate a bench case into (theme, generator parameters)"""
+    params = dict(case)
+    return params.pop('theme', None), params
+
+
+def capture_inputs(generator, kind, case):
+    """Run a cover once and return the template inputs it was drawn with"""
+    captured = {}
+    render_scaled = generator.render_scaled
+
+    def capture(name, theme=None, scale=1.0, pool=None, **inputs):
+        captured.update(inputs)
+        return render_scaled(name, theme, scale, pool, **inputs)
+
+    generator.render_scaled = capture
+    try:
+        theme, params = split_case(case)
+        generator.generate(kind, theme, output='image', **params)
+    finally:
+        del generator.render_scaled
+    return captured
+
+
+def bench_generators(generator, cases, repeat=10):
+    """Time generate(kind) end to end (render and PNG encode) for every case"""
+    results = {}
+    for kind, case in cases.items():
+        theme, params = split_case(case)
+        results[kind] = time_calls(
+            lambda: generator.generate(kind, theme, output='bytes', **params), repeat)
+    return results
+
+
+def bench_stages(generator, cases, repeat=10):
+    """Time each pipeline stage of every cover type separately
+
+    font_load:   opening the template's fonts in a fresh registry
+    background:  building the background in a fresh gradient engine
+    compile:     compiling the template and drawing its base layer from scratch
+    text_layout: wrapping and fitting the dynamic text (glyph metrics warm)
+    draw:        drawing a cover onto the cached base layer
+    encode:      PNG encoding through the cover's encoder
+    """
+    size = (generator.width, generator.height)
+    results = {}
+    for kind, case in cases.items():
+        theme, _ = split_case(case)
+        spec = generator.templates.get_spec(kind)
+        inputs = capture_inputs(generator, kind, case)
+        plan = generator.templates.compile(kind, theme, size)
+        encoder = generator.get_encoder(kind)
+        image = plan.render(inputs)
+
+        def load_fonts():
+            registry = FontRegistry(generator.fonts_dir)
+            for font_name, font_size in plan.font_specs:
+                registry.get(font_name, font_size)
+
+        def build_background():
+            if plan.background_type == 'gradient':
+                GradientEngine().get(*plan.background_colors, size, plan.gradient_mode)
+            else:
+                Image.new('RGB', size, plan.background_colors[0])
+
+        def compile_plan():
+            RenderPlan(spec, theme, size, generator.fonts, generator.gradients).base_layer(inputs)
+
+        dynamic_text = [element for element in plan.elements
+                        if isinstance(element, TextElement) and not element.baked]
+
+        def layout_text():
+            for element in dynamic_text:
+                element.layout(size, element.text.format(**inputs))
+
+        results[kind] = {
+            'font_load': time_calls(load_fonts, repeat),
+            'background': time_calls(build_background, repeat),
+            'compile': time_calls(compile_plan, repeat),
+            'text_layout': time_calls(layout_text, repeat),
+            'draw': time_calls(lambda: plan.render(inputs), repeat),
+            'encode': time_calls(lambda: encoder.encode(image), repeat),
+        }
+    return results
+
+
+def bench_batch(cases, worker_counts, batch_size=48):
+    """Measure batch throughput (covers per second) at each worker count"""
+    kinds = list(cases)
+    entries = []
+    for i in range(batch_size):
+        kind = kinds[i % len(kinds)]
+        theme, params = split_case(cases[kind])
+        entries.append({'generator': kind, 'theme': theme,
+                        'params': dict(params, output='bytes')})
+
+    results = {}
+    for workers in worker_counts:
+        start = time.perf_counter()
+        failed = sum(1 for _, ok, _, _ in run_batch(entries, workers) if not ok)
+        elapsed = time.perf_counter() - start
+        results[str(workers)] = {
+            'covers': batch_size,
+            'failed': failed,
+            'seconds': round(elapsed, 3),
+            'covers_per_s': round((batch_size - failed) / elapsed, 2),
+        }
+    return results
+
+
+def bench_startup(repeat=10):
+    """Time each cold start case in a new Python process"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for case, args in STARTUP_CASES.items():
+        command = [sys.executable] + args
+        results[case] = time_calls(
+            lambda: subprocess.run(command, cwd=base_dir, stdout=subprocess.DEVNULL,
+                                   check=True), repeat)
+    return results
+
+
+def environment():
+    """Describe the machine and library versions the numbers were taken on"""
+    return {
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run_benchmarks(kinds=None, repeat=10, worker_counts=None, batch_size=48, startup=True):
+    """Run the whole suite and return the results as a JSON-ready dict"""
+    generator = ImageGenerator(verbose=False)
+    generator.warm_fonts()
+    cases = {kind: case for kind, case in BENCH_CASES.items() if not kinds or kind in kinds}
+    results = {
+        'environment': environment(),
+        'generators': bench_generators(generator, cases, repeat),
+        'stages': bench_stages(generator, cases, repeat),
+    }
+    if worker_counts:
+        results['batch'] = bench_batch(cases, worker_counts, batch_size)
+    if startup:
+        results['startup'] = bench_startup(repeat)
+    return results
+
+
+def flatten_metrics(results):
+    """Return {'generators.stoic_quote.median_ms': value, ...} for comparison"""
+    metrics = {}
+    for kind, stats in results.get('generators', {}).items():
+        metrics[f"generators.{kind}.median_ms"] = stats['median_ms']
+    for kind, stages in results.get('stages', {}).items():
+        for stage, stats in stages.items():
+            metrics[f"stages.{kind}.{stage}.median_ms"] = stats['median_ms']
+    for workers, stats in results.get('batch', {}).items():
+        metrics[f"batch.{workers}.covers_per_s"] = stats['covers_per_s']
+    for case, stats in results.get('startup', {}).items():
+        metrics[f"startup.{case}.median_ms"] = stats['median_ms']
+    return metrics
+
+
+def compare(results, baseline, threshold=0.10, min_delta_ms=0.25):
+    """Compare results with a baseline, returning one row per metric found in both
+
+    Each row has the relative change (positive means slower, or less throughput) and a
+    status of 'regression', 'improvement' or 'same' given the threshold. Durations that
+    moved by less than min_delta_ms are always 'same', since sub-millisecond stages are noisy.
+    """
+    current = flatten_metrics(results)
+    previous = flatten_metrics(baseline)
+    rows = []
+    for metric in sorted(current.keys() & previous.keys()):
+        before, after = previous[metric], current[metric]
+        if not before:
+            continue
+        change = (after - before) / before
+        if metric.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if not metric.endswith(HIGHER_IS_BETTER) and abs(after - before) < min_delta_ms:
+            status = 'same'
+        elif change > threshold:
+            status = 'regression'
+        elif change < -threshold:
+            status = 'improvement'
+        else:
+            status = 'same'
+        rows.append({'metric': metric, 'baseline': before, 'current': after,
+                     'change': round(change, 4), 'status': status})
+    return rows
+
+
+def print_results(results):
+    """Print a readable summary of a benchmark run"""
+    print(f"{'cover':<22}{'median ms':>11}{'p95 ms':>10}")
+    for kind, stats in results['generators'].items():
+        print(f"{kind:<22}{stats['median_ms']:>11.2f}{stats['p95_ms']:>10.2f}")
+
+    stages = next(iter(results['stages'].values()), {})
+    print(f"\n{'stage (median ms)':<22}" + ''.join(f"{stage:>12}" for stage in stages))
+    for kind, kind_stages in results['stages'].items():
+        print(f"{kind:<22}" + ''.join(f"{stats['median_ms']:>12.2f}"
+                                      for stats in kind_stages.values()))
+
+    if results.get('batch'):
+        print(f"\n{'workers':<22}{'covers/s':>11}{'seconds':>10}")
+        for workers, stats in results['batch'].items():
+            print(f"{workers:<22}{stats['covers_per_s']:>11.1f}{stats['seconds']:>10.2f}")
+
+    if results.get('startup'):
+        print(f"\n{'startup':<22}{'median ms':>11}{'p95 ms':>10}")
+        for case, stats in results['startup'].items():
+            print(f"{case:<22}{stats['median_ms']:>11.1f}{stats['p95_ms']:>10.1f}")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark cover generation.")
+    parser.add_argument('--only', nargs='+', choices=list(BENCH_CASES),
+                        help="cover types to benchmark (default: all)")
+    parser.add_argument('--repeat', type=int, default=10, help="timed runs per measurement")
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help="worker counts for the batch benchmark (default: 1, 2, 4 ... CPUs)")
+    parser.add_argument('--batch-size', type=int, default=48,
+                        help="covers per batch benchmark run")
+    parser.add_argument('--no-batch', action='store_true', help="skip the batch benchmark")
+    parser.add_argument('--no-startup', action='store_true',
+                        help="skip the cold start benchmark")
+    parser.add_argument('--startup-target-ms', type=float, default=None,
+                        help=f"fail if the {STARTUP_TARGET_CASE} cold start median is slower")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    parser.add_argument('--baseline', help="compare against results saved earlier")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="relative change reported as a regression (default: 0.10)")
+    parser.add_argument('--min-delta-ms', type=float, default=0.25,
+                        help="ignore duration changes smaller than this (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpus:
+            worker_counts.append(worker_counts[-1] * 2)
+    if args.no_batch:
+        worker_counts = []
+
+    print("⏱️  Running benchmarks...\n")
+    results = run_benchmarks(args.only, args.repeat, worker_counts, args.batch_size,
+                             not args.no_startup)
+    print_results(results)
+
+    status = 0
+    if args.startup_target_ms is not None and 'startup' in results:
+        median = results['startup'][STARTUP_TARGET_CASE]['median_ms']
+        if median > args.startup_target_ms:
+            print(f"\n❌ {STARTUP_TARGET_CASE} cold start {median:.1f} ms is over the "
+                  f"{args.startup_target_ms:.0f} ms target")
+            status = 1
+        else:
+            print(f"\n✓ {STARTUP_TARGET_CASE} cold start {median:.1f} ms is within the "
+                  f"{args.startup_target_ms:.0f} ms target")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved: {args.output}")
+
+    if not args.baseline:
+        return status
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold, args.min_delta_ms)
+    regressions = [row for row in rows if row['status'] == 'regression']
+    improvements = [row for row in rows if row['status'] == 'improvement']
+    print(f"\n📊 Compared with {args.baseline}: {len(regressions)} slower, "
+          f"{len(improvements)} faster, {len(rows) - len(regressions) - len(improvements)} "
+          f"within {args.threshold:.0%}")
+    for row in regressions + improvements:
+        marker = '❌' if row['status'] == 'regression' else '✓'
+        print(f"{marker} {row['metric']}: {row['baseline']} → {row['current']} "
+              f"({row['change']:+.1%})")
+    return 1 if regressions else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
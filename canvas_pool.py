@@ -0,0 +1,152 @@
+from PIL import Image
+from collections import OrderedDict
+from contextlib import contextmanager
+import sys
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def canvas_bytes(mode, size):
+    """Return the memory a canvas takes (Pillow stores RGB pixels in 4 bytes)"""
+    pixel_bytes = 1 if mode in ('1', 'L', 'P') else 4
+    return size[0] * size[1] * pixel_bytes
+
+
+def peak_rss_kb():
+    """Return the peak resident memory of this process in KiB, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class CanvasPool:
+    """Recycles render canvases by (mode, size) instead of allocating one per render
+
+    acquire() hands out a canvas reset with a fill color or a paste of a source image,
+    and release() returns it once it has been encoded. Only canvases the pool lent out
+    are taken back, so an image that was handed to a caller is never reused. Idle
+    canvases are bounded by max_idle_bytes, so memory stays flat under load.
+    """
+
+    def __init__(self, max_idle_bytes=64 * 1024 * 1024):
+        self.max_idle_bytes = max_idle_bytes
+        self.allocated = 0
+        self.reused = 0
+        self.discarded = 0
+        self.in_use_bytes = 0
+        self.peak_in_use_bytes = 0
+        self.idle_bytes = 0
+        self._idle = OrderedDict()
+        self._lent = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, mode, size, fill=None, source=None):
+        """Return a canvas of (mode, size), filled with a color or a copy of source"""
+        key = (mode, tuple(size))
+        nbytes = canvas_bytes(mode, key[1])
+        with self._lock:
+            idle = self._idle.get(key)
+            image = idle.pop() if idle else None
+            if idle is not None and not idle:
+                # trim() expects every idle size to still hold a canvas
+                del self._idle[key]
+            if image is not None:
+                self.idle_bytes -= nbytes
+                self.reused += 1
+            else:
+                self.allocated += 1
+            self.in_use_bytes += nbytes
+            self.peak_in_use_bytes = max(self.peak_in_use_bytes, self.in_use_bytes)
+
+        if image is None:
+            if source is not None:
+                image = source.copy()
+            else:
+                image = Image.new(mode, key[1], fill if fill is not None else 0)
+        elif source is not None:
+            image.paste(source, (0, 0))
+        elif fill is not None:
+            image.paste(fill, (0, 0) + key[1])
+
+        with self._lock:
+            self._lent[id(image)] = image
+        return image
+
+    def release(self, image):
+        """Take a canvas back for reuse; anything the pool did not lend out is ignored"""
+        key = (image.mode, image.size)
+        nbytes = canvas_bytes(*key)
+        with self._lock:
+            if self._lent.pop(id(image), None) is None:
+                return False
+            self.in_use_bytes -= nbytes
+            if self.idle_bytes + nbytes > self.max_idle_bytes:
+                self.discarded += 1
+                return False
+            self._idle.setdefault(key, []).append(image)
+            self._idle.move_to_end(key)
+            self.idle_bytes += nbytes
+            return True
+
+    def detach(self, image):
+        """Hand a lent canvas over to the caller for good, so it is never reused"""
+        with self._lock:
+            if self._lent.pop(id(image), None) is not None:
+                self.in_use_bytes -= canvas_bytes(image.mode, image.size)
+
+    @contextmanager
+    def canvas(self, mode, size, fill=None, source=None):
+        """Lend a canvas for the duration of a with block"""
+        image = self.acquire(mode, size, fill, source)
+        try:
+            yield image
+        finally:
+            self.release(image)
+
+    def trim(self, max_idle_bytes=0):
+        """Free idle canvases, least recently used sizes first, down to max_idle_bytes"""
+        with self._lock:
+            while self.idle_bytes > max_idle_bytes and self._idle:
+                key, images = next(iter(self._idle.items()))
+                images.pop()
+                self.idle_bytes -= canvas_bytes(*key)
+                if not images:
+                    del self._idle[key]
+
+    def stats(self):
+        """Return allocation counts and current and peak memory figures"""
+        with self._lock:
+            stats = {
+                'allocated': self.allocated,
+                'reused': self.reused,
+                'discarded': self.discarded,
+                'in_use': len(self._lent),
+                'in_use_bytes': self.in_use_bytes,
+                'peak_in_use_bytes': self.peak_in_use_bytes,
+                'idle': sum(len(images) for images in self._idle.values()),
+                'idle_bytes': self.idle_bytes,
+                'max_idle_bytes': self.max_idle_bytes,
+            }
+        peak = peak_rss_kb()
+        if peak is not None:
+            stats['peak_rss_kb'] = peak
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_canvas_pool():
+    """Return the process-wide canvas pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CanvasPool()
+        return _pool
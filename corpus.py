@@ -0,0 +1,232 @@
+from bisect import bisect_left, bisect_right
+import json
+import mmap
+import os
+import random
+import threading
+import time
+
+# Filter suffixes for range queries, e.g. year__gt=1950
+RANGE_OPERATORS = ('gt', 'gte', 'lt', 'lte')
+
+
+def _normalize(value):
+    """Make string lookups case-insensitive"""
+    return value.casefold() if isinstance(value, str) else value
+
+
+class Corpus:
+    """One quote/book collection, loaded once and reloaded when the file changes
+
+    .json files hold a JSON array and are parsed into memory. .jsonl files hold one
+    record per line and are memory-mapped: only line offsets and the indexes are kept,
+    records are parsed when they are sampled.
+    """
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime = None
+        self._checked = 0.0
+        self._records = None
+        self._offsets = None
+        self._mmap = None
+        self._equality = {}
+        self._numeric = {}
+        self._candidates = {}
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        """Load on first use and reload when the file's mtime changes"""
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            self._load()
+            self._mtime = mtime
+
+    def _load(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._records = None
+        self._offsets = None
+        self._candidates = {}
+
+        if self.path.endswith('.jsonl'):
+            records = self._load_jsonl()
+        else:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._records = json.load(f)
+            records = enumerate(self._records)
+        self._build_indexes(records)
+
+    def _load_jsonl(self):
+        """Memory-map a JSONL file and yield (index, record) while recording line offsets"""
+        offsets = []
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._offsets = offsets
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = offsets
+        start = 0
+        size = len(self._mmap)
+        while start < size:
+            end = self._mmap.find(b'\n', start)
+            if end == -1:
+                end = size
+            line = self._mmap[start:end].strip()
+            if line:
+                offsets.append((start, end))
+                yield len(offsets) - 1, json.loads(line)
+            start = end + 1
+
+    def _build_indexes(self, records):
+        """Index every scalar field for equality lookups and numeric fields for ranges"""
+        equality = {}
+        numeric = {}
+        for index, record in records:
+            if not isinstance(record, dict):
+                continue
+            for field, value in record.items():
+                if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                    equality.setdefault(field, {}).setdefault(_normalize(value), []).append(index)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    numeric.setdefault(field, []).append((value, index))
+        # Keep sorted keys and positions side by side so range lookups can bisect
+        self._numeric = {}
+        for field, values in numeric.items():
+            values.sort()
+            self._numeric[field] = ([value for value, _ in values],
+                                    [index for _, index in values])
+        self._equality = equality
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._records) if self._records is not None else len(self._offsets)
+
+    def get(self, index):
+        """Return the record at a position"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._records is not None:
+                return self._records[index]
+            start, end = self._offsets[index]
+            return json.loads(self._mmap[start:end])
+
+    def records(self):
+        """Return every record as a list"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._records is not None:
+                return list(self._records)
+            return [self.get(index) for index in range(len(self._offsets))]
+
+    def _range_candidates(self, field, operator, value):
+        keys, positions = self._numeric.get(field, ([], []))
+        if operator == 'gt':
+            return positions[bisect_right(keys, value):]
+        if operator == 'gte':
+            return positions[bisect_left(keys, value):]
+        if operator == 'lt':
+            return positions[:bisect_left(keys, value)]
+        return positions[:bisect_right(keys, value)]
+
+    def candidates(self, **filters):
+        """Return the record positions matching every filter
+
+        Filters are field=value for equality (case-insensitive for strings) or
+        field__gt/gte/lt/lte=value for numeric ranges. Results are cached until reload.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if not filters:
+                return None
+            key = tuple(sorted(filters.items()))
+            cached = self._candidates.get(key)
+            if cached is not None:
+                return cached
+
+            matches = None
+            for name, value in filters.items():
+                field, _, operator = name.partition('__')
+                if operator:
+                    if operator not in RANGE_OPERATORS:
+                        raise ValueError(f"Unknown filter operator: {name}")
+                    found = self._range_candidates(field, operator, value)
+                else:
+                    found = self._equality.get(field, {}).get(_normalize(value), [])
+                matches = set(found) if matches is None else matches & set(found)
+            result = sorted(matches)
+            self._candidates[key] = result
+            return result
+
+    def contains(self, record, **filters):
+        """Return True if the record is in the collection and matches the filters"""
+        with self._lock:
+            positions = self.candidates(**filters)
+            if isinstance(record, dict):
+                # Narrow to the records sharing every indexed field before comparing
+                for field, value in record.items():
+                    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                        found = self._equality.get(field, {}).get(_normalize(value), [])
+                        positions = found if positions is None else set(positions) & set(found)
+            if positions is None:
+                positions = range(len(self))
+            return any(self.get(position) == record for position in sorted(positions))
+
+    def sample(self, rng=None, **filters):
+        """Return one random record, optionally restricted by filters"""
+        rng = rng or random
+        with self._lock:
+            positions = self.candidates(**filters)
+            if positions is None:
+                count = len(self)
+                if count == 0:
+                    raise ValueError(f"{os.path.basename(self.path)} is empty")
+                return self.get(rng.randrange(count))
+            if not positions:
+                described = ', '.join(f"{name}={value!r}" for name, value in filters.items())
+                raise ValueError(f"No entries in {os.path.basename(self.path)} match {described}")
+            return self.get(positions[rng.randrange(len(positions))])
+
+
+class CorpusStore:
+    """Keeps one Corpus per data file"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._corpora = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """Return the corpus for a data file, preferring a .jsonl twin if one exists"""
+        with self._lock:
+            corpus = self._corpora.get(filename)
+            if corpus is None:
+                path = os.path.join(self.data_dir, filename)
+                jsonl_path = os.path.splitext(path)[0] + '.jsonl'
+                if os.path.exists(jsonl_path):
+                    path = jsonl_path
+                corpus = Corpus(path)
+                self._corpora[filename] = corpus
+            return corpus
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_corpus_store(data_dir):
+    """Return the process-wide corpus store for a data directory"""
+    data_dir = os.path.abspath(data_dir)
+    with _stores_lock:
+        store = _stores.get(data_dir)
+        if store is None:
+            store = CorpusStore(data_dir)
+            _stores[data_dir] = store
+        return store
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+Cover daemon.
+Keeps warm render workers running behind a Unix domain socket, so scripts pay for a
+render instead of a Python start, a Pillow import and a font load on every cover.
+The client side imports only light standard library modules, so it starts quickly.
+
+Protocol: one JSON object per line in each direction. A request is a manifest entry
+plus an optional "id", e.g. {"id": 1, "generator": "year_progress", "theme": "dark"},
+and is answered with {"id": 1, "ok": true, "path": "...", "ms": 12.3}. With "sizes", e.g.
+["1x", "2x"], "path" (or "data" and "filename") maps each size to its result. Requests may be
+pipelined: they render concurrently and each response is written as soon as it is ready,
+so clients match responses to requests by id.
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import sys
+import time
+
+DEFAULT_SOCKET = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'daemon.sock')
+
+# Fields of a request that are not cover parameters
+REQUEST_FIELDS = ('id', 'op', 'output', 'format', 'sizes')
+
+# Longest request line the daemon reads
+MAX_LINE = 1024 * 1024
+
+
+def render_request(kind, theme, params, format=None, sizes=None):
+    """Render one cover to bytes, returning (data, filename, content_type)
+
+    With sizes, data and filename are dicts with an entry per size.
+    """
+    from workers import get_generator
+    generator = get_generator()
+    cover = generator.generate(kind, theme, output='inputs', **params)
+    encoder = generator.get_encoder(cover['kind'], format)
+    content_type = f"image/{encoder.format.lower()}"
+    stem = os.path.splitext(cover['filename'])[0]
+    if sizes is None:
+        data = generator.generate_template(cover['kind'], cover['theme'], output='bytes',
+                                           format=encoder, **cover['inputs'])
+        return data, stem + encoder.extension, content_type
+    data = generator.generate_template(cover['kind'], cover['theme'], output='bytes',
+                                       format=encoder, sizes=sizes, **cover['inputs'])
+    filenames = {size: stem + suffix + encoder.extension
+                 for size, _, suffix in generator.resolve_sizes(sizes)}
+    return data, filenames, content_type
+
+
+def socket_in_use(path):
+    """Return True if a daemon is already listening on a socket path"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+class CoverDaemon:
+    """Answers JSON-lines render requests from local clients on a bounded executor
+
+    Every connection may pipeline up to max_in_flight requests; past that the daemon
+    stops reading from it until a render finishes, so a greedy client cannot queue
+    unbounded work. Covers are written to output/ by the daemon itself, which keeps
+    filenames unique across workers, or returned inline with "output": "bytes".
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, workers=None, executor='process',
+                 cache=False, encoder='png', max_in_flight=64):
+        from batch import normalize_entry
+        from image_generator import ImageGenerator
+        from workers import make_executor
+        self.normalize_entry = normalize_entry
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight
+        self.generator = ImageGenerator(verbose=False)
+        self.started = time.time()
+        self.in_flight = 0
+        self.stats = {'connections': 0, 'requests': 0, 'rendered': 0, 'errors': 0}
+        self._stopping = None
+        self.executor = make_executor(executor, self.workers, render_cache=cache,
+                                      encoder=encoder)
+
+    def close(self):
+        """Shut down the render executor"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def save(self, data, filename):
+        """Write a rendered cover, or {size: bytes} with its filenames, to the output folder"""
+        if isinstance(data, dict):
+            return {size: self.generator.save_bytes(data[size], filename[size]) for size in data}
+        return self.generator.save_bytes(data, filename)
+
+    async def handle(self, request):
+        """Answer one decoded request and return the response (without its id)"""
+        import asyncio
+        op = request.get('op', 'render')
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid(), 'uptime': round(time.time() - self.started, 3)}
+        if op == 'stats':
+            return dict(self.stats, ok=True, in_flight=self.in_flight, workers=self.workers)
+        if op == 'shutdown':
+            self._stopping.set()
+            return {'ok': True}
+        if op != 'render':
+            return {'ok': False, 'error': f"Unknown op: {op}"}
+
+        output = request.get('output', 'file')
+        if output not in ('file', 'bytes'):
+            return {'ok': False, 'error': f"Unknown output: {output}"}
+        sizes = request.get('sizes')
+        if sizes is not None and (not isinstance(sizes, list) or not sizes):
+            return {'ok': False, 'error': "sizes must be a non-empty list, e.g. [\"1x\", \"2x\"]"}
+        start = time.perf_counter()
+        try:
+            entry = self.normalize_entry({key: value for key, value in request.items()
+                                          if key not in REQUEST_FIELDS})
+            loop = asyncio.get_running_loop()
+            data, filename, content_type = await loop.run_in_executor(
+                self.executor, render_request, entry['generator'], entry['theme'],
+                entry['params'], request.get('format'), sizes)
+            if output == 'file':
+                # Writing is blocking disk I/O, so keep it off the event loop
+                path = await loop.run_in_executor(None, self.save, data, filename)
+                response = {'path': path}
+            elif sizes is None:
+                response = {'data': base64.b64encode(data).decode('ascii'),
+                            'content_type': content_type, 'filename': filename}
+            else:
+                response = {'data': {size: base64.b64encode(data[size]).decode('ascii')
+                                     for size in data},
+                            'content_type': content_type, 'filename': filename}
+        except Exception as e:
+            self.stats['errors'] += 1
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        self.stats['rendered'] += 1
+        response.update(ok=True, ms=round((time.perf_counter() - start) * 1000, 2))
+        return response
+
+    async def respond(self, line, sequence, writer, write_lock, slots):
+        """Answer one request line and write its response as soon as it is ready"""
+        try:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+            except ValueError as e:
+                self.stats['errors'] += 1
+                request = {}
+                response = {'ok': False, 'error': f"Invalid request: {e}"}
+            else:
+                self.stats['requests'] += 1
+                self.in_flight += 1
+                try:
+                    response = await self.handle(request)
+                finally:
+                    self.in_flight -= 1
+            # Unnumbered requests are answered with their position on the connection
+            response = dict(response, id=request.get('id', sequence))
+            async with write_lock:
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            slots.release()
+
+    async def serve_connection(self, reader, writer):
+        """Read pipelined requests from one client until it closes its end"""
+        import asyncio
+        self.stats['connections'] += 1
+        write_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        sequence = 0
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Longer than MAX_LINE: the rest of the stream cannot be framed
+                    slots.release()
+                    break
+                if not line:
+                    slots.release()
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.create_task(
+                    self.respond(line, sequence, writer, write_lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sequence += 1
+            # The client may close its write side and still read every pending response
+            await asyncio.gather(*tasks)
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled when the daemon shuts down with this client still connected
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        """Listen on the socket until a client sends {"op": "shutdown"} or we are cancelled"""
+        import asyncio
+        if os.path.exists(self.socket_path):
+            if socket_in_use(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            # Left behind by a daemon that did not shut down cleanly
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+        self._stopping = asyncio.Event()
+        server = await asyncio.start_unix_server(self.serve_connection, self.socket_path,
+                                                 limit=MAX_LINE)
+        # Only the owner may ask this daemon to write files
+        os.chmod(self.socket_path, 0o600)
+        try:
+            async with server:
+                await self._stopping.wait()
+        finally:
+            try:
+                os.remove(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+class DaemonClient:
+    """A thin blocking client for a running daemon, importing nothing but the standard library"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path)
+        self.reader = self.socket.makefile('rb')
+        self._next_id = 0
+
+    def close(self):
+        """Close the connection"""
+        self.reader.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, request):
+        """Send one request without waiting for its response, returning its id"""
+        if 'id' not in request:
+            request = dict(request, id=self._next_id)
+            self._next_id += 1
+        self.socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        return request['id']
+
+    def receive(self):
+        """Wait for the next response, whichever request it answers"""
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("The daemon closed the connection")
+        return json.loads(line)
+
+    def request(self, request):
+        """Send one request and wait for its response"""
+        request_id = self.send(request)
+        while True:
+            response = self.receive()
+            if response.get('id') == request_id:
+                return response
+
+    def pipeline(self, requests, window=32):
+        """Send requests with up to window outstanding, yielding responses as they arrive"""
+        pending = 0
+        for request in requests:
+            if pending >= window:
+                yield self.receive()
+                pending -= 1
+            self.send(request)
+            pending += 1
+        for _ in range(pending):
+            yield self.receive()
+
+
+def read_requests(path, on_error=None):
+    """Yield requests from a JSONL file, or stdin for '-', skipping blanks and # comments
+
+    Requests without an id are numbered by their line. A line that is not a JSON object
+    is passed to on_error(line number, error) and skipped, so the rest are still sent.
+    """
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+            except ValueError as e:
+                if on_error is not None:
+                    on_error(number, f"Invalid request: {e}")
+                continue
+            request.setdefault('id', number)
+            yield request
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def serve(args):
+    """Run the daemon in the foreground"""
+    import asyncio
+    daemon = CoverDaemon(args.socket, args.workers, args.executor, args.cache, args.encoder,
+                         args.max_in_flight)
+    print(f"🌐 Listening on {args.socket} ({daemon.workers} {args.executor} workers)")
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+    print("👋 Daemon stopped")
+    return 0
+
+
+def render(args, client):
+    """Render one cover through the daemon"""
+    from params import parse_assignments
+    try:
+        request = {'generator': args.type, 'params': parse_assignments(args.set)}
+    except ValueError as e:
+        print(f"❌ --set {e}", file=sys.stderr)
+        return 2
+    if args.theme:
+        request['theme'] = args.theme
+    if args.format:
+        request['format'] = args.format
+    if args.sizes:
+        if args.stdout:
+            print("❌ --stdout writes one image and cannot be used with --sizes", file=sys.stderr)
+            return 2
+        request['sizes'] = args.sizes
+    if args.stdout:
+        request['output'] = 'bytes'
+    response = client.request(request)
+    if not response['ok']:
+        print(f"❌ {response['error']}", file=sys.stderr)
+        return 1
+    if args.stdout:
+        sys.stdout.buffer.write(base64.b64decode(response['data']))
+        sys.stdout.buffer.flush()
+    elif args.sizes:
+        for path in response['path'].values():
+            print(path)
+    else:
+        print(response['path'])
+    return 0
+
+
+def send(args, client):
+    """Pipeline every request of a JSONL file through the daemon"""
+    start = time.perf_counter()
+    failed = 0
+    total = 0
+
+    def report_invalid(number, error):
+        nonlocal failed, total
+        failed += 1
+        total += 1
+        print(f"❌ [line {number}] {error}")
+
+    requests = read_requests(args.requests, report_invalid)
+    for response in client.pipeline(requests, args.window):
+        total += 1
+        if response['ok']:
+            result = response.get('path', response.get('filename'))
+            if isinstance(result, dict):
+                result = ', '.join(result.values())
+            print(f"✓ [{response['id']}] {result} ({response['ms']:.0f} ms)")
+        else:
+            failed += 1
+            print(f"❌ [{response['id']}] {response['error']}")
+    elapsed = time.perf_counter() - start
+    print(f"\n📊 {total - failed}/{total} covers in {elapsed:.2f}s")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render covers through a long-running daemon.")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help="Unix socket path (default: .cache/daemon.sock)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="run the daemon in the foreground")
+    serve_parser.add_argument('-w', '--workers', type=int, default=None,
+                              help="number of render workers (default: CPU count)")
+    serve_parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                              help="render in worker processes or threads")
+    serve_parser.add_argument('--max-in-flight', type=int, default=64,
+                              help="pipelined requests per client before reading pauses")
+    serve_parser.add_argument('--cache', action='store_true',
+                              help="reuse identical renders from the on-disk render cache")
+    serve_parser.add_argument('--encoder', default='png',
+                              help="default encoder preset, e.g. png, png-palette, webp")
+
+    render_parser = commands.add_parser('render', help="render one cover")
+    render_parser.add_argument('type', help="cover type, e.g. year_progress")
+    render_parser.add_argument('--theme', help="theme name, e.g. dark")
+    render_parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                               help="cover parameter, may be repeated")
+    render_parser.add_argument('--format', help="encoder preset, e.g. webp")
+    render_parser.add_argument('--sizes', nargs='+', metavar='SIZE',
+                               help="render several sizes, e.g. 1x 2x thumb")
+    render_parser.add_argument('--stdout', action='store_true',
+                               help="write the image to stdout instead of output/")
+
+    send_parser = commands.add_parser('send', help="pipeline a JSONL file of requests")
+    send_parser.add_argument('requests', help="JSONL file of requests, or - for stdin")
+    send_parser.add_argument('--window', type=int, default=32,
+                             help="requests outstanding at once (default: 32)")
+
+    commands.add_parser('ping', help="check that the daemon is running")
+    commands.add_parser('stats', help="print the daemon's counters")
+    commands.add_parser('stop', help="shut the daemon down")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print("❌ Unix domain sockets are not available on this platform; "
+              "use server.py instead", file=sys.stderr)
+        return 2
+    if args.command == 'serve':
+        return serve(args)
+
+    try:
+        client = DaemonClient(args.socket)
+    except OSError as e:
+        print(f"❌ No daemon on {args.socket} ({e}); start one with: python daemon.py serve",
+              file=sys.stderr)
+        return 1
+    with client:
+        if args.command == 'render':
+            return render(args, client)
+        if args.command == 'send':
+            return send(args, client)
+        op = {'ping': 'ping', 'stats': 'stats', 'stop': 'shutdown'}[args.command]
+        response = client.request({'op': op})
+        print(json.dumps(response, indent=2))
+        return 0 if response['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Encoder presets shared by all generators.
+Run this file to benchmark every preset against each cover type.
+"""
+
+from PIL import Image
+import argparse
+import io
+import json
+import sys
+import time
+
+
+class Encoder:
+    """Encodes images with one fixed set of format settings"""
+
+    def __init__(self, name, format, extension, options=None, palette_colors=None):
+        self.name = name
+        self.format = format
+        self.extension = extension
+        self.options = dict(options or {})
+        # Reduce to an adaptive palette of at most this many colors before encoding
+        self.palette_colors = palette_colors
+
+    def prepare(self, image):
+        """Return the image in the mode this encoder writes"""
+        if self.palette_colors:
+            return quantize(image, self.palette_colors)
+        if self.format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            return image.convert('RGB')
+        return image
+
+    def encode(self, image, buffer=None):
+        """Encode an image, writing into buffer if given, otherwise returning the bytes"""
+        image = self.prepare(image)
+        if buffer is not None:
+            image.save(buffer, format=self.format, **self.options)
+            return buffer
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.format, **self.options)
+        return buffer.getvalue()
+
+    def describe(self):
+        """Return the settings that affect the encoded bytes"""
+        return {
+            'name': self.name,
+            'format': self.format,
+            'options': self.options,
+            'palette_colors': self.palette_colors,
+        }
+
+
+def quantize(image, colors):
+    """Convert to a palette image, losslessly when the image already has few colors"""
+    exact = image.getcolors(maxcolors=256)
+    if exact is not None:
+        # Flat layouts: build the palette from the exact colors so nothing shifts
+        palette_image = Image.new('P', (1, 1))
+        palette = []
+        for _, color in exact:
+            palette.extend(color[:3] if isinstance(color, tuple) else (color,) * 3)
+        palette_image.putpalette(palette)
+        return image.convert('RGB').quantize(palette=palette_image, dither=Image.NONE)
+    return image.convert('RGB').quantize(colors=colors, method=Image.FASTOCTREE,
+                                         dither=Image.NONE)
+
+
+ENCODERS = {}
+
+
+def register_encoder(encoder):
+    """Add an encoder preset, replacing any preset with the same name"""
+    ENCODERS[encoder.name] = encoder
+    return encoder
+
+
+def get_encoder(name):
+    """Look up an encoder preset by name (case-insensitive, 'PNG' == 'png')"""
+    if isinstance(name, Encoder):
+        return name
+    encoder = ENCODERS.get(name.lower())
+    if encoder is None:
+        raise ValueError(f"Unknown encoder: {name}")
+    return encoder
+
+
+register_encoder(Encoder('png', 'PNG', '.png'))
+register_encoder(Encoder('png-fast', 'PNG', '.png', {'compress_level': 1}))
+register_encoder(Encoder('png-small', 'PNG', '.png', {'optimize': True}))
+register_encoder(Encoder('png-palette', 'PNG', '.png', {'compress_level': 6}, palette_colors=64))
+register_encoder(Encoder('webp', 'WEBP', '.webp', {'quality': 85, 'method': 4}))
+register_encoder(Encoder('webp-lossless', 'WEBP', '.webp', {'lossless': True, 'method': 4}))
+register_encoder(Encoder('jpeg', 'JPEG', '.jpg', {'quality': 90}))
+
+
+def benchmark_encoders(images, encoders=None, repeat=3):
+    """Time every encoder against every image, returning one result dict per pair"""
+    encoders = [get_encoder(name) for name in (encoders or ENCODERS)]
+    results = []
+    for template, image in images.items():
+        for encoder in encoders:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                data = encoder.encode(image)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results.append({
+                'template': template,
+                'encoder': encoder.name,
+                'ms': round(best * 1000, 3),
+                'bytes': len(data),
+            })
+    return results
+
+
+def sample_covers(generator):
+    """Render one image of each built-in cover type without saving it"""
+    return {
+        'stoic_quote': generator.generate_stoic_quote('dark', output='image'),
+        'anime_quote': generator.generate_anime_quote(output='image'),
+        'book_recommendation': generator.generate_book_recommendation('light', output='image'),
+        'year_progress': generator.generate_year_progress('light', output='image'),
+        'life_progress': generator.generate_life_progress(1990, 80, 'dark', output='image'),
+        'motivational_text': generator.generate_motivational_text(
+            "The obstacle is the way.", 'dark', output='image'),
+    }
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark encoder presets per cover type.")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per encoder (best is kept)")
+    parser.add_argument('--encoder', action='append', dest='encoders',
+                        help="preset to include (repeatable, default: all)")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    from image_generator import ImageGenerator
+    results = benchmark_encoders(sample_covers(ImageGenerator(verbose=False)),
+                                 args.encoders, args.repeat)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    print(f"{'template':<22}{'encoder':<16}{'ms':>10}{'bytes':>10}")
+    for result in results:
+        print(f"{result['template']:<22}{result['encoder']:<16}"
+              f"{result['ms']:>10.2f}{result['bytes']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+from PIL import ImageFont
+from collections import OrderedDict
+import os
+import threading
+
+
+class FontRegistry:
+    """Shared LRU cache of loaded font faces keyed by (font file, size)"""
+
+    def __init__(self, fonts_dir, max_size=64):
+        self.fonts_dir = fonts_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fonts = OrderedDict()
+        self._missing = set()
+        self._lock = threading.Lock()
+
+    def get(self, font_name, size):
+        """Return a cached font, loading it from disk on first use"""
+        key = (font_name, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        font = self._load(font_name, size)
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_size:
+                self._fonts.popitem(last=False)
+        return font
+
+    def _load(self, font_name, size):
+        """Load a face from disk, remembering files that failed to load"""
+        with self._lock:
+            missing = font_name in self._missing
+        if not missing:
+            try:
+                return ImageFont.truetype(os.path.join(self.fonts_dir, font_name), size)
+            except OSError:
+                # Resolve a missing face once so later sizes skip straight to the fallback
+                with self._lock:
+                    self._missing.add(font_name)
+        return ImageFont.load_default()
+
+    def warm(self, fonts):
+        """Pre-load an iterable of (font file, size) pairs"""
+        for font_name, size in fonts:
+            self.get(font_name, size)
+
+    def clear(self):
+        """Drop every cached face and reset the counters"""
+        with self._lock:
+            self._fonts.clear()
+            self._missing.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counts and current cache occupancy"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._fonts),
+                'max_size': self.max_size,
+                'missing': sorted(self._missing),
+            }
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_font_registry(fonts_dir):
+    """Return the process-wide registry for a fonts directory"""
+    fonts_dir = os.path.abspath(fonts_dir)
+    with _registries_lock:
+        registry = _registries.get(fonts_dir)
+        if registry is None:
+            registry = FontRegistry(fonts_dir)
+            _registries[fonts_dir] = registry
+        return registry
@@ -0,0 +1,99 @@
+from PIL import Image, ImageChops
+from collections import OrderedDict
+import threading
+
+GRADIENT_MODES = ('vertical', 'horizontal', 'diagonal', 'radial')
+
+
+class GradientEngine:
+    """Builds gradient backgrounds in a single pass and memoizes the results"""
+
+    def __init__(self, max_size=32):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._masks = {}
+        self._backgrounds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_mask(self, size, mode):
+        """Return an L-mode blend mask going from 0 (color1) to 255 (color2)"""
+        width, height = size
+        if mode == 'vertical':
+            # Linear ramps only vary along one axis, so blend a 1px strip
+            return Image.linear_gradient('L').resize((1, height), Image.BILINEAR)
+        if mode == 'horizontal':
+            ramp = Image.linear_gradient('L').transpose(Image.ROTATE_90)
+            return ramp.resize((width, 1), Image.BILINEAR)
+        if mode == 'diagonal':
+            vertical = self._get_mask(size, 'vertical').resize(size, Image.NEAREST)
+            horizontal = self._get_mask(size, 'horizontal').resize(size, Image.NEAREST)
+            return ImageChops.add(vertical, horizontal, scale=2.0)
+        if mode == 'radial':
+            return Image.radial_gradient('L').resize(size, Image.BILINEAR)
+        raise ValueError(f"Unknown gradient mode: {mode}")
+
+    def _get_mask(self, size, mode):
+        key = (size, mode)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._build_mask(size, mode)
+            self._masks[key] = mask
+        return mask
+
+    def _render(self, color1, color2, size, mode):
+        mask = self._get_mask(size, mode)
+        start = Image.new('RGB', mask.size, color1)
+        end = Image.new('RGB', mask.size, color2)
+        background = Image.composite(end, start, mask)
+        if background.size != size:
+            background = background.resize(size, Image.NEAREST)
+        return background
+
+    def get(self, color1, color2, size, mode='vertical'):
+        """Return a fresh copy of the gradient for (color1, color2, size, mode)"""
+        key = (tuple(color1), tuple(color2), tuple(size), mode)
+        with self._lock:
+            background = self._backgrounds.get(key)
+            if background is not None:
+                self._backgrounds.move_to_end(key)
+                self.hits += 1
+                return background.copy()
+            self.misses += 1
+
+            background = self._render(key[0], key[1], key[2], mode)
+            self._backgrounds[key] = background
+            while len(self._backgrounds) > self.max_size:
+                self._backgrounds.popitem(last=False)
+        return background.copy()
+
+    def clear(self):
+        """Drop every memoized gradient and reset the counters"""
+        with self._lock:
+            self._masks.clear()
+            self._backgrounds.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counts and current cache occupancy"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._backgrounds),
+                'max_size': self.max_size,
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_gradient_engine():
+    """Return the process-wide gradient engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = GradientEngine()
+        return _engine
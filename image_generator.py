@@ -1,448 +1,569 @@
-from PIL import Image, ImageDraw, ImageFont
-import json
-import random
+from PIL import Image
 import os
-from datetime import datetime, date
-import textwrap
+import random
+from fractions import Fraction
+from font_cache import get_font_registry
+from gradients import get_gradient_engine
+from naming import get_output_namer
+from render_cache import RenderCache, fingerprint_fonts
+from encoders import get_encoder
+from layout import TemplateEngine, resolve_theme, shrink
+from corpus import get_corpus_store
+from sampling import Sampler
+from tracing import NullTracer, print_saved
+from progress import ROUNDING_MODES, current_time, progress, round_percentage
+from precompute import BUNDLE_KINDS, BundleStore
+from themes import get_theme_registry
+from text_layout import clear_metrics, get_sprite_cache
+from canvas_pool import get_canvas_pool
+
+# Cover types that can be requested by name through ImageGenerator.generate
+GENERATORS = (
+    'stoic_quote',
+    'anime_quote',
+    'book_recommendation',
+    'year_progress',
+    'life_progress',
+    'period_progress',
+    'motivational_text',
+)
+
+# Named output sizes: scale of the 1500x600 canvas and the filename suffix
+SIZE_PRESETS = {
+    '1x': (1.0, ''),
+    '2x': (2.0, '@2x'),
+    'thumb': (0.25, '_thumb'),
+}
+
+def cover_kind(name):
+    """Return the cover type a name refers to, accepting the 'generate_' method prefix"""
+    return name[len('generate_'):] if name.startswith('generate_') else name
 
 class ImageGenerator:
-    def __init__(self):
+    def __init__(self, verbose=True, naming='counter', render_cache=None, encoder='png',
+                 template_encoders=None, seed=None, bundles=None, timezone=None,
+                 rounding='floor', tracer=None):
         self.base_dir = os.path.dirname(os.path.abspath(__file__))
         self.fonts_dir = os.path.join(self.base_dir, 'fonts')
         self.data_dir = os.path.join(self.base_dir, 'data')
         self.output_dir = os.path.join(self.base_dir, 'output')
         self.templates_dir = os.path.join(self.base_dir, 'templates')
+        self.bundle_dir = os.path.join(self.base_dir, '.cache', 'bundles')
+        
+        # Fonts are shared by every generator in the process
+        self.fonts = get_font_registry(self.fonts_dir)
+        self.gradients = get_gradient_engine()
+        
+        # Quote and book collections are loaded once and indexed
+        self.corpora = get_corpus_store(self.data_dir)
+        
+        # With a seed, entries are drawn in a reproducible order without repeats
+        self.sampler = Sampler(seed) if seed is not None else None
+        
+        # Named palettes from themes.json, validated once and shared by every template
+        self.themes = get_theme_registry(os.path.join(self.base_dir, 'themes.json'))
+        
+        # Canvases of encoded covers are recycled instead of allocated per render
+        self.canvases = get_canvas_pool()
+        
+        # Cover layouts are JSON templates compiled once into render plans
+        self.templates = TemplateEngine(self.templates_dir, self.fonts, self.gradients,
+                                        self.themes)
         
         # Create output directory if it doesn't exist
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # 'counter' names files "name (n).png", 'hash' names them by content
+        if naming not in ('counter', 'hash'):
+            raise ValueError(f"Unknown naming mode: {naming}")
+        self.naming = naming
+        self.namer = get_output_namer(self.output_dir)
+        
+        # Optional RenderCache (or True for the default on-disk location)
+        if render_cache is True:
+            render_cache = RenderCache(os.path.join(self.base_dir, '.cache', 'renders'))
+        self.render_cache = render_cache or None
+        
+        # Optional BundleStore of precomputed progress covers (or True for the default one)
+        if bundles is True:
+            bundles = BundleStore(self.bundle_dir)
+        self.bundles = bundles or None
+        
+        # Default encoder preset, optionally overridden per cover type
+        self.encoder = get_encoder(encoder)
+        self.template_encoders = {kind: get_encoder(name)
+                                  for kind, name in (template_encoders or {}).items()}
+        
+        # Spans, counters and events for every render; a NullTracer costs next to nothing
+        self.tracer = tracer or NullTracer()
+        self.tracer.add_collector('font_cache', self.fonts.stats)
+        self.tracer.add_collector('gradient_cache', self.gradients.stats)
+        self.tracer.add_collector('sprite_cache', get_sprite_cache().stats)
+        self.tracer.add_collector('canvas_pool', self.canvases.stats)
+        if self.render_cache is not None:
+            self.tracer.add_collector('render_cache', self.render_cache.stats)
+        if self.bundles is not None:
+            self.tracer.add_collector('bundles', self.bundles.stats)
+        
+        # Print a confirmation line for every saved image
+        self.verbose = verbose
+        if verbose:
+            self.tracer.add_listener(print_saved)
+        
+        # Progress covers follow the calendar of this time zone (default: the system's)
+        self.timezone = timezone
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f"Unknown rounding mode: {rounding}")
+        self.rounding = rounding
+        
         # Standard image dimensions for Notion covers
         self.width = 1500
         self.height = 600
         
     def get_font(self, font_name, size):
         """Get font with fallback to default if font file not found"""
-        font_path = os.path.join(self.fonts_dir, font_name)
-        try:
-            return ImageFont.truetype(font_path, size)
-        except:
-            return ImageFont.load_default()
+        return self.fonts.get(font_name, size)
+    
+    def warm_fonts(self, fonts=None):
+        """Pre-load the fonts used by the generators"""
+        if fonts is None:
+            fonts = [tuple(font) for name in self.templates.names()
+                     for font in self.templates.get_spec(name)['fonts'].values()]
+        self.fonts.warm(fonts)
+    
+    def reload(self):
+        """Re-read templates, themes and fonts after they changed on disk"""
+        self.themes.reload()
+        self.templates.reload()
+        self.fonts.clear()
+        clear_metrics()
+        get_sprite_cache().clear()
+    
+    def generate(self, kind, theme=None, **params):
+        """Generate a cover by type name, e.g. generate('year_progress', theme='dark')"""
+        kind = cover_kind(kind)
+        if kind not in GENERATORS:
+            # Covers defined only by a template need no Python of their own
+            if kind in self.templates.names():
+                return self.generate_template(kind, theme, **params)
+            raise ValueError(f"Unknown generator: {kind}")
+        if theme is not None:
+            params['theme'] = theme
+        return getattr(self, f"generate_{kind}")(**params)
     
     def get_unique_filename(self, base_filename):
-        """Generate a unique filename by adding a counter if file already exists"""
-        filepath = os.path.join(self.output_dir, base_filename)
-        
-        # If the file doesn't exist, return the original filename
-        if not os.path.exists(filepath):
-            return base_filename
-        
-        # Extract name and extension
-        name, ext = os.path.splitext(base_filename)
-        counter = 1
-        
-        # Keep incrementing counter until we find a non-existing filename
-        while True:
-            new_filename = f"{name} ({counter}){ext}"
-            new_filepath = os.path.join(self.output_dir, new_filename)
-            if not os.path.exists(new_filepath):
-                return new_filename
-            counter += 1
-    
-    def create_gradient_background(self, color1, color2):
-        """Create a simple gradient background"""
-        image = Image.new('RGB', (self.width, self.height), color1)
-        draw = ImageDraw.Draw(image)
-        
-        # Simple vertical gradient
-        for y in range(self.height):
-            ratio = y / self.height
-            r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
-            g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
-            b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
-            draw.line([(0, y), (self.width, y)], fill=(r, g, b))
-        
-        return image
+        """Reserve a unique filename by adding a counter if the name is already taken"""
+        return self.namer.claim(base_filename)
+    
+    def save_image(self, image, base_filename, encoder='png'):
+        """Save an image to the output directory and return its path"""
+        with self.tracer.span('encode'):
+            data = get_encoder(encoder).encode(image)
+        return self.save_bytes(data, base_filename)
+    
+    def save_bytes(self, data, base_filename):
+        """Write already encoded image bytes to the output directory and return the path"""
+        with self.tracer.span('write'):
+            if self.naming == 'hash':
+                filepath = os.path.join(self.output_dir, self.namer.write_content(base_filename, data))
+            else:
+                filename = self.get_unique_filename(base_filename)
+                filepath = os.path.join(self.output_dir, filename)
+                try:
+                    with open(filepath, 'wb') as f:
+                        f.write(data)
+                except BaseException:
+                    # Never leave an empty placeholder behind for later scans to count
+                    self.namer.release(filename)
+                    raise
+        self.tracer.count('bytes_written', len(data))
+        return filepath
+    
+    def encode_image(self, image, format='png', buffer=None):
+        """Encode an image, writing into buffer if given, otherwise returning the bytes"""
+        return get_encoder(format).encode(image, buffer)
+    
+    def get_encoder(self, kind, format=None):
+        """Resolve the encoder for a cover: explicit format, then per-type default, then global"""
+        if format is not None:
+            return get_encoder(format)
+        return self.template_encoders.get(kind, self.encoder)
+    
+    def cache_key(self, kind, inputs, theme=None, encoder=None, scale=1.0):
+        """Return the render cache key for a cover at a scale of the canvas"""
+        spec = self.templates.get_spec(kind)
+        fonts = fingerprint_fonts(self.fonts_dir, [tuple(font) for font in spec['fonts'].values()])
+        encoder = self.get_encoder(kind, encoder)
+        return RenderCache.make_key(kind, inputs, theme, fonts, self.scaled_size(scale),
+                                    extra={'encoder': encoder.describe(), 'template': spec,
+                                           'palette': dict(self.templates.palette(kind, theme))})
+    
+    def _encode_pooled(self, draw, encoder, buffer=None):
+        """Draw a cover on a pooled canvas, encode it and give the canvas back"""
+        image = draw(self.canvases)
+        try:
+            with self.tracer.span('encode'):
+                return encoder.encode(image, buffer)
+        finally:
+            self.canvases.release(image)
+    
+    def _produce(self, kind, inputs, theme, base_filename, label, draw,
+                 output='file', format=None, buffer=None):
+        """Render a cover via draw(), or reuse an identical cached render, and deliver it
+        
+        output='file' saves to the output folder and returns the path, 'image' returns
+        the PIL image and 'bytes' returns the encoded bytes (or writes them into buffer).
+        format is an encoder preset name such as 'png', 'png-fast' or 'webp'.
+        draw(pool) may draw on a canvas from the pool; covers that are only encoded
+        return it straight away, images handed to the caller never come from the pool.
+        """
+        if output not in ('file', 'image', 'bytes'):
+            raise ValueError(f"Unknown output mode: {output}")
+        encoder = self.get_encoder(kind, format)
+        
+        if output == 'image':
+            return draw()
+        
+        tracer = self.tracer
+        with tracer.span('lookup'):
+            data = self.lookup_precomputed(kind, inputs, theme, encoder)
+        if data is None and self.render_cache is None:
+            if output == 'bytes':
+                return self._encode_pooled(draw, encoder, buffer)
+            base_filename = os.path.splitext(base_filename)[0] + encoder.extension
+            image = draw(self.canvases)
+            try:
+                filepath = self.save_image(image, base_filename, encoder)
+            finally:
+                self.canvases.release(image)
+        else:
+            if data is None:
+                with tracer.span('lookup'):
+                    key = self.cache_key(kind, inputs, theme, encoder)
+                    data = self.render_cache.get_bytes(key)
+                if data is None:
+                    data = self._encode_pooled(draw, encoder)
+                    self.render_cache.put(key, data)
+            if output == 'bytes':
+                if buffer is None:
+                    return data
+                buffer.write(data)
+                return buffer
+            base_filename = os.path.splitext(base_filename)[0] + encoder.extension
+            filepath = self.save_bytes(data, base_filename)
+        
+        tracer.event('saved', kind=kind, label=label, path=filepath)
+        return filepath
+    
+    def lookup_precomputed(self, kind, inputs, theme, encoder):
+        """Return a cover's bytes from a precomputed bundle, or None if there is none"""
+        if self.bundles is None or kind not in BUNDLE_KINDS:
+            return None
+        spec = self.templates.get_spec(kind)
+        theme = resolve_theme(spec, theme, self.themes)
+        fingerprint = self.cache_key(kind, {}, theme, encoder)
+        return self.bundles.lookup(kind, theme, encoder.name, fingerprint, inputs)
+    
+    def create_gradient_background(self, color1, color2, mode='vertical'):
+        """Create a gradient background (vertical, horizontal, diagonal or radial)"""
+        return self.gradients.get(color1, color2, (self.width, self.height), mode)
     
     def create_solid_background(self, color):
         """Create a solid color background"""
         return Image.new('RGB', (self.width, self.height), color)
     
     def load_data(self, filename):
-        """Load JSON data from the data directory"""
-        filepath = os.path.join(self.data_dir, filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """Load every entry of a data file (cached until the file changes)"""
+        return self.corpora.get(filename).records()
     
-    def generate_stoic_quote(self, theme='dark'):
-        """Generate a stoic quote image"""
-        quotes = self.load_data('stoic_quotes.json')
-        quote = random.choice(quotes)
-        
-        # Choose colors based on theme
-        if theme == 'dark':
-            bg_color = (30, 30, 40)
-            text_color = (255, 255, 255)
-            accent_color = (180, 180, 180)
+    def uses_data(self, kind):
+        """Return True if a cover type draws its inputs from a data file"""
+        return bool(self.templates.get_spec(cover_kind(kind)).get('data'))
+    
+    def pick_entry(self, spec, filters=None, seed=None, sample_index=None):
+        """Pick an entry from a template's data file as render inputs
+        
+        filters narrow the choice, e.g. {'anime': 'Naruto'} or {'year__gt': 1950}.
+        seed makes this one pick reproducible; on a seeded generator, entries are drawn
+        without repeats and sample_index selects a fixed position in that sequence.
+        """
+        data = spec['data']
+        corpus = self.corpora.get(data['file'])
+        filters = filters or {}
+        if seed is not None:
+            entry = corpus.sample(random.Random(seed), **filters)
+        elif self.sampler is not None:
+            entry = self.sampler.draw(corpus, sample_index, **filters)
+        elif sample_index is not None:
+            raise ValueError("sample_index requires an ImageGenerator created with a seed")
         else:
-            bg_color = (245, 245, 250)
-            text_color = (50, 50, 50)
-            accent_color = (100, 100, 100)
-        
-        # Create background
-        image = self.create_solid_background(bg_color)
-        draw = ImageDraw.Draw(image)
-        
-        # Add quote text
-        font_large = self.get_font('NewYork.ttf', 32)
-        font_small = self.get_font('Helvetica-Neue-Pro-Light.ttf', 18)
-        
-        # Wrap text
-        max_width = self.width - 200
-        lines = textwrap.wrap(quote, width=60)
-        
-        # Calculate total text height
-        line_height = 50
-        total_height = len(lines) * line_height
-        start_y = (self.height - total_height) // 2
-        
-        # Draw each line centered
-        for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font_large)
-            text_width = bbox[2] - bbox[0]
-            x = (self.width - text_width) // 2
-            y = start_y + i * line_height
-            draw.text((x, y), line, font=font_large, fill=text_color)
-        
-        # Add attribution
-        attribution = "— Stoic Philosophy"
-        bbox = draw.textbbox((0, 0), attribution, font=font_small)
-        attr_width = bbox[2] - bbox[0]
-        attr_x = (self.width - attr_width) // 2
-        attr_y = start_y + total_height + 30
-        draw.text((attr_x, attr_y), attribution, font=font_small, fill=accent_color)
-        
-        # Save image
-        base_filename = f"stoic_quote_{theme}.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Stoic quote image saved: {filepath}")
-        return filepath
+            entry = corpus.sample(**filters)
+        if isinstance(entry, dict):
+            return dict(entry)
+        return {data.get('field', 'value'): entry}
     
-    def generate_anime_quote(self):
-        """Generate an anime quote image"""
-        quotes = self.load_data('anime_quotes.json')
-        quote_data = random.choice(quotes)
-        
-        # Dark anime-style background
-        bg_color1 = (20, 25, 40)
-        bg_color2 = (40, 45, 70)
-        image = self.create_gradient_background(bg_color1, bg_color2)
-        draw = ImageDraw.Draw(image)
-        
-        # Fonts
-        font_quote = self.get_font('Helvetica-Neue-Pro-Light.ttf', 28)
-        font_char = self.get_font('NewYork.ttf', 20)
-        font_anime = self.get_font('Helvetica-Neue-Pro-Light-Italic.ttf', 16)
-        
-        # Colors
-        text_color = (255, 255, 255)
-        char_color = (255, 200, 100)
-        anime_color = (200, 200, 200)
-        
-        # Quote text
-        lines = textwrap.wrap(quote_data['quote'], width=50)
-        line_height = 45
-        total_height = len(lines) * line_height
-        start_y = (self.height - total_height - 100) // 2
-        
-        # Draw quote lines
-        for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font_quote)
-            text_width = bbox[2] - bbox[0]
-            x = (self.width - text_width) // 2
-            y = start_y + i * line_height
-            draw.text((x, y), line, font=font_quote, fill=text_color)
-        
-        # Character name
-        char_text = f"— {quote_data['character']}"
-        bbox = draw.textbbox((0, 0), char_text, font=font_char)
-        char_width = bbox[2] - bbox[0]
-        char_x = (self.width - char_width) // 2
-        char_y = start_y + total_height + 20
-        draw.text((char_x, char_y), char_text, font=font_char, fill=char_color)
-        
-        # Anime name
-        anime_text = quote_data['anime']
-        bbox = draw.textbbox((0, 0), anime_text, font=font_anime)
-        anime_width = bbox[2] - bbox[0]
-        anime_x = (self.width - anime_width) // 2
-        anime_y = char_y + 35
-        draw.text((anime_x, anime_y), anime_text, font=font_anime, fill=anime_color)
-        
-        # Save image
-        base_filename = "anime_quote.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Anime quote image saved: {filepath}")
-        return filepath
+    def has_entry(self, kind, inputs, filters=None):
+        """Return True if inputs are still an entry of a cover type's data file
+        
+        inputs is what pick_entry returned; filters must match as they did for the pick.
+        """
+        data = self.templates.get_spec(kind)['data']
+        corpus = self.corpora.get(data['file'])
+        filters = filters or {}
+        field = data.get('field', 'value')
+        if list(inputs) == [field] and corpus.contains(inputs[field], **filters):
+            return True
+        return corpus.contains(inputs, **filters)
     
-    def generate_book_recommendation(self, theme='light'):
-        """Generate a book recommendation image"""
-        books = self.load_data('books.json')
-        book = random.choice(books)
-        
-        # Choose colors based on theme
-        if theme == 'dark':
-            bg_color = (25, 25, 35)
-            text_color = (255, 255, 255)
-            accent_color = (200, 200, 200)
-        else:
-            bg_color = (250, 248, 240)
-            text_color = (40, 40, 40)
-            accent_color = (80, 80, 80)
-        
-        # Create background
-        image = self.create_solid_background(bg_color)
-        draw = ImageDraw.Draw(image)
-        
-        # Fonts
-        font_title = self.get_font('NewYork.ttf', 48)
-        font_author = self.get_font('Helvetica-Neue-Pro-Light.ttf', 24)
-        font_year = self.get_font('Helvetica-Neue-Pro-Light-Italic.ttf', 18)
-        font_label = self.get_font('Helvetica-Neue-Pro-Light.ttf', 20)
-        
-        # Draw label
-        label = "Book Recommendation"
-        bbox = draw.textbbox((0, 0), label, font=font_label)
-        label_width = bbox[2] - bbox[0]
-        label_x = (self.width - label_width) // 2
-        draw.text((label_x, 150), label, font=font_label, fill=accent_color)
-        
-        # Draw title
-        title_lines = textwrap.wrap(book['title'], width=30)
-        line_height = 60
-        start_y = 220
-        
-        for i, line in enumerate(title_lines):
-            bbox = draw.textbbox((0, 0), line, font=font_title)
-            text_width = bbox[2] - bbox[0]
-            x = (self.width - text_width) // 2
-            y = start_y + i * line_height
-            draw.text((x, y), line, font=font_title, fill=text_color)
-        
-        # Draw author
-        author_y = start_y + len(title_lines) * line_height + 30
-        bbox = draw.textbbox((0, 0), f"by {book['author']}", font=font_author)
-        author_width = bbox[2] - bbox[0]
-        author_x = (self.width - author_width) // 2
-        draw.text((author_x, author_y), f"by {book['author']}", font=font_author, fill=text_color)
-        
-        # Draw year
-        year_y = author_y + 40
-        bbox = draw.textbbox((0, 0), f"Published: {book['year']}", font=font_year)
-        year_width = bbox[2] - bbox[0]
-        year_x = (self.width - year_width) // 2
-        draw.text((year_x, year_y), f"Published: {book['year']}", font=font_year, fill=accent_color)
-        
-        # Save image
-        base_filename = f"book_recommendation_{theme}.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Book recommendation image saved: {filepath}")
-        return filepath
+    def render_template(self, name, theme=None, **inputs):
+        """Render a template with explicit inputs and return the image"""
+        return self.render_scaled(name, theme, 1.0, **inputs)
     
-    def generate_year_progress(self, theme='light'):
-        """Generate year progress image"""
-        # Calculate progress
-        now = datetime.now()
-        start_of_year = datetime(now.year, 1, 1)
-        days_passed = (now - start_of_year).days
-        days_in_year = 366 if now.year % 4 == 0 else 365
-        progress_percentage = int((days_passed / days_in_year) * 100)
-        
-        # Choose colors based on theme
-        if theme == 'dark':
-            bg_color = (20, 20, 30)
-            text_color = (255, 255, 255)
-            progress_color = (100, 200, 100)
-            bar_bg_color = (60, 60, 70)
-        else:
-            bg_color = (248, 248, 252)
-            text_color = (40, 40, 40)
-            progress_color = (50, 150, 50)
-            bar_bg_color = (200, 200, 210)
-        
-        # Create background
-        image = self.create_solid_background(bg_color)
-        draw = ImageDraw.Draw(image)
-        
-        # Fonts
-        font_large = self.get_font('NewYork-Bold.ttf', 72)
-        font_medium = self.get_font('Helvetica-Neue-Pro-Light.ttf', 24)
-        
-        # Main percentage
-        percentage_text = f"{progress_percentage}%"
-        bbox = draw.textbbox((0, 0), percentage_text, font=font_large)
-        perc_width = bbox[2] - bbox[0]
-        perc_x = (self.width - perc_width) // 2
-        draw.text((perc_x, 200), percentage_text, font=font_large, fill=text_color)
-        
-        # Description
-        desc_text = f"of year {now.year} completed"
-        bbox = draw.textbbox((0, 0), desc_text, font=font_medium)
-        desc_width = bbox[2] - bbox[0]
-        desc_x = (self.width - desc_width) // 2
-        draw.text((desc_x, 290), desc_text, font=font_medium, fill=text_color)
-        
-        # Progress bar
-        bar_width = 600
-        bar_height = 20
-        bar_x = (self.width - bar_width) // 2
-        bar_y = 350
-        
-        # Background bar
-        draw.rectangle([bar_x, bar_y, bar_x + bar_width, bar_y + bar_height], 
-                      fill=bar_bg_color, outline=None)
-        
-        # Progress bar
-        progress_width = int(bar_width * (progress_percentage / 100))
-        draw.rectangle([bar_x, bar_y, bar_x + progress_width, bar_y + bar_height], 
-                      fill=progress_color, outline=None)
-        
-        # Days info
-        days_text = f"{days_passed} of {days_in_year} days"
-        bbox = draw.textbbox((0, 0), days_text, font=font_medium)
-        days_width = bbox[2] - bbox[0]
-        days_x = (self.width - days_width) // 2
-        draw.text((days_x, 400), days_text, font=font_medium, fill=text_color)
-        
-        # Save image
-        base_filename = f"year_progress_{theme}.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Year progress image saved: {filepath}")
-        return filepath
+    def render_scaled(self, name, theme=None, scale=1.0, pool=None, **inputs):
+        """Render a template at a multiple of the canvas size, e.g. 2.0 for retina
+        
+        With a CanvasPool the image is drawn on a recycled canvas to be released after use.
+        """
+        size = self.scaled_size(scale)
+        with self.tracer.span('compile'):
+            plan = self.templates.compile(name, theme, size)
+        return plan.render(inputs, self.tracer, pool)
     
-    def generate_life_progress(self, birth_year, life_expectancy, theme='light'):
-        """Generate life progress image"""
-        current_year = datetime.now().year
+    def scaled_size(self, scale):
+        """Return the canvas size at a scale"""
+        return max(1, round(self.width * scale)), max(1, round(self.height * scale))
+    
+    def resolve_sizes(self, sizes):
+        """Turn size presets ('1x', '2x', 'thumb') or numeric scales into (size, scale, suffix)"""
+        resolved = []
+        for size in sizes:
+            if size in SIZE_PRESETS:
+                scale, suffix = SIZE_PRESETS[size]
+            else:
+                try:
+                    scale = float(size)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Unknown size: {size} (use one of "
+                                     f"{', '.join(SIZE_PRESETS)} or a scale)") from None
+                if not 0 < scale <= 4:
+                    raise ValueError(f"Scale must be between 0 and 4: {size}")
+                suffix = '' if scale == 1 else f"@{scale:g}x"
+            resolved.append((size, scale, suffix))
+        if not resolved:
+            raise ValueError("sizes must name at least one size")
+        return resolved
+    
+    def _lookup_size(self, kind, inputs, theme, encoder, scale):
+        """Return a size's bytes from a precomputed bundle or the render cache, else None"""
+        data = None
+        with self.tracer.span('lookup'):
+            if scale == 1:
+                data = self.lookup_precomputed(kind, inputs, theme, encoder)
+            if data is None and self.render_cache is not None:
+                data = self.render_cache.get_bytes(
+                    self.cache_key(kind, inputs, theme, encoder, scale))
+        return data
+    
+    def _produce_sizes(self, kind, inputs, theme, base_filename, label, draw, sizes,
+                       output='file', format=None):
+        """Render a cover once at its largest size and derive every other size from it
+        
+        draw(scale) renders the master; smaller sizes are downscaled copies, so layout
+        and drawing happen once per set. Encoded sizes are looked up like single covers
+        first, so the master is only drawn if some size is in no bundle or cache.
+        Returns {size: path, image or bytes}.
+        """
+        if output not in ('file', 'image', 'bytes'):
+            raise ValueError(f"Unknown output mode: {output}")
+        sizes = self.resolve_sizes(sizes)
+        encoder = self.get_encoder(kind, format)
+        tracer = self.tracer
+        master_scale = max(scale for _, scale, _ in sizes)
+        master = None
+        
+        results = {}
+        for size, scale, suffix in sizes:
+            data = None
+            if output != 'image':
+                data = self._lookup_size(kind, inputs, theme, encoder, scale)
+            if data is None:
+                if master is None:
+                    master = draw(master_scale)
+                with tracer.span('resize'):
+                    image = shrink(master, self.scaled_size(scale))
+                if output == 'image':
+                    results[size] = image
+                    continue
+                with tracer.span('encode'):
+                    data = encoder.encode(image)
+                if self.render_cache is not None:
+                    self.render_cache.put(self.cache_key(kind, inputs, theme, encoder, scale),
+                                          data)
+            if output == 'bytes':
+                results[size] = data
+            else:
+                stem = os.path.splitext(base_filename)[0]
+                filepath = self.save_bytes(data, stem + suffix + encoder.extension)
+                tracer.event('saved', kind=kind, label=label, path=filepath)
+                results[size] = filepath
+        return results
+    
+    def generate_template(self, name, theme=None, output='file', format=None, buffer=None,
+                          filters=None, seed=None, sample_index=None, sizes=None, **inputs):
+        """Generate a cover from a template, drawing a data entry if no inputs are given
+        
+        sizes, e.g. ['1x', '2x', 'thumb'], renders one master and returns a dict with a
+        result per size instead of a single result. output='inputs' draws nothing and
+        returns what would be drawn: {'kind', 'theme', 'inputs', 'filename'}.
+        """
+        spec = self.templates.get_spec(name)
+        with self.tracer.span('render', kind=name):
+            if not inputs and spec.get('data'):
+                with self.tracer.span('data'):
+                    inputs = self.pick_entry(spec, filters, seed, sample_index)
+            
+            file_theme = theme if theme is not None else spec.get('fallback_theme', '')
+            base_filename = spec.get('filename', f"{name}.png").format(**dict(inputs, theme=file_theme))
+            label = spec.get('label', name.replace('_', ' ').capitalize())
+            if output == 'inputs':
+                return {'kind': name, 'theme': resolve_theme(spec, theme, self.themes),
+                        'inputs': inputs, 'filename': base_filename}
+            # Counted only once something is produced, not when a caller just resolves inputs
+            self.tracer.count('renders', kind=name)
+            if sizes is not None:
+                if buffer is not None:
+                    raise ValueError("buffer cannot be used with sizes")
+                return self._produce_sizes(
+                    name, inputs, theme, base_filename, label,
+                    lambda scale: self.render_scaled(name, theme, scale, **inputs),
+                    sizes, output, format)
+            return self._produce(name, inputs, theme, base_filename, label,
+                                 lambda pool=None: self.render_scaled(name, theme, 1.0, pool,
+                                                                      **inputs),
+                                 output, format, buffer)
+    
+    def generate_stoic_quote(self, theme='dark', output='file', format=None, buffer=None,
+                             seed=None, sample_index=None, sizes=None):
+        """Generate a stoic quote image"""
+        return self.generate_template('stoic_quote', theme, output, format, buffer,
+                                      seed=seed, sample_index=sample_index, sizes=sizes)
+    
+    def render_stoic_quote(self, quote, theme='dark'):
+        """Draw a stoic quote cover and return the image"""
+        return self.render_template('stoic_quote', theme, quote=quote)
+    
+    def generate_anime_quote(self, output='file', format=None, buffer=None, seed=None,
+                             sample_index=None, sizes=None, theme=None, **filters):
+        """Generate an anime quote image, optionally filtered, e.g. anime='Naruto'"""
+        return self.generate_template('anime_quote', theme, output, format, buffer, filters,
+                                      seed, sample_index, sizes)
+    
+    def render_anime_quote(self, quote_data, theme=None):
+        """Draw an anime quote cover and return the image"""
+        return self.render_template('anime_quote', theme, **quote_data)
+    
+    def generate_book_recommendation(self, theme='light', output='file', format=None,
+                                     buffer=None, seed=None, sample_index=None, sizes=None,
+                                     **filters):
+        """Generate a book recommendation image, optionally filtered, e.g. year__gt=1950"""
+        return self.generate_template('book_recommendation', theme, output, format, buffer,
+                                      filters, seed, sample_index, sizes)
+    
+    def render_book_recommendation(self, book, theme='light'):
+        """Draw a book recommendation cover and return the image"""
+        return self.render_template('book_recommendation', theme, **book)
+    
+    def year_progress_inputs(self, year, days_passed, days_in_year, rounding=None):
+        """Return the template inputs for a year progress cover"""
+        progress_percentage = round_percentage(Fraction(days_passed, days_in_year),
+                                               rounding or self.rounding)
+        return {
+            'year': year,
+            'days_passed': days_passed,
+            'days_in_year': days_in_year,
+            'progress_percentage': progress_percentage,
+            'progress': progress_percentage / 100,
+        }
+    
+    def generate_year_progress(self, theme='light', output='file', format=None, buffer=None,
+                               tz=None, rounding=None, now=None, sizes=None):
+        """Generate year progress image for today in a time zone (or for a given now)"""
+        rounding = rounding or self.rounding
+        year = progress('year', tz or self.timezone, now, rounding)
+        inputs = self.year_progress_inputs(year.start.year, year.elapsed, year.total, rounding)
+        return self.generate_template('year_progress', theme, output, format, buffer,
+                                      sizes=sizes, **inputs)
+    
+    def render_year_progress(self, year, days_passed, days_in_year, theme='light'):
+        """Draw a year progress cover and return the image"""
+        inputs = self.year_progress_inputs(year, days_passed, days_in_year)
+        return self.render_template('year_progress', theme, **inputs)
+    
+    def period_progress_inputs(self, period_progress):
+        """Return the template inputs for a progress.Progress of any period"""
+        return {
+            'period': period_progress.period,
+            'label': period_progress.label,
+            'days_passed': period_progress.elapsed,
+            'total_days': period_progress.total,
+            'progress_percentage': period_progress.percentage,
+            'progress': period_progress.percentage / 100,
+        }
+    
+    def generate_period_progress(self, period='month', theme='light', output='file',
+                                 format=None, buffer=None, start=None, end=None, tz=None,
+                                 rounding=None, now=None, week_start=0, sizes=None):
+        """Generate a progress image for the current month, quarter, week or a custom range"""
+        period_progress = progress(period, tz or self.timezone, now, rounding or self.rounding,
+                                   start, end, week_start)
+        inputs = self.period_progress_inputs(period_progress)
+        return self.generate_template('period_progress', theme, output, format, buffer,
+                                      sizes=sizes, **inputs)
+    
+    def life_progress_inputs(self, birth_year, life_expectancy, current_year, rounding=None):
+        """Return the template inputs for a life progress cover, raising ValueError if invalid"""
+        for name, value in (('birth_year', birth_year), ('life_expectancy', life_expectancy),
+                            ('current_year', current_year)):
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise ValueError(f"{name} must be a whole number, got {value!r}")
+        if life_expectancy <= 0:
+            raise ValueError(f"life_expectancy must be positive, got {life_expectancy}")
+        if birth_year > current_year:
+            raise ValueError(f"birth_year {birth_year} is in the future")
         current_age = current_year - birth_year
-        progress_percentage = int((current_age / life_expectancy) * 100)
-        
-        # Choose colors based on theme
-        if theme == 'dark':
-            bg_color = (25, 25, 35)
-            text_color = (255, 255, 255)
-            progress_color = (150, 100, 200)
-            bar_bg_color = (60, 60, 70)
-        else:
-            bg_color = (252, 248, 248)
-            text_color = (40, 40, 40)
-            progress_color = (120, 80, 160)
-            bar_bg_color = (210, 200, 200)
-        
-        # Create background
-        image = self.create_solid_background(bg_color)
-        draw = ImageDraw.Draw(image)
-        
-        # Fonts
-        font_large = self.get_font('NewYork.ttf', 60)
-        font_medium = self.get_font('Helvetica-Neue-Pro-Light.ttf', 22)
-        font_small = self.get_font('Helvetica-Neue-Pro-Light-Italic.ttf', 18)
-
-        # Title
-        title = "Life Progress"
-        bbox = draw.textbbox((0, 0), title, font=font_medium)
-        title_width = bbox[2] - bbox[0]
-        title_x = (self.width - title_width) // 2
-        draw.text((title_x, 150), title, font=font_medium, fill=text_color)
-        
-        # Main percentage
-        percentage_text = f"{progress_percentage}%"
-        bbox = draw.textbbox((0, 0), percentage_text, font=font_large)
-        perc_width = bbox[2] - bbox[0]
-        perc_x = (self.width - perc_width) // 2
-        draw.text((perc_x, 200), percentage_text, font=font_large, fill=text_color)
-        
-        # Description
-        desc_text = f"Age {current_age} of {life_expectancy} years"
-        bbox = draw.textbbox((0, 0), desc_text, font=font_medium)
-        desc_width = bbox[2] - bbox[0]
-        desc_x = (self.width - desc_width) // 2
-        draw.text((desc_x, 280), desc_text, font=font_medium, fill=text_color)
-        
-        # Progress bar
-        bar_width = 600
-        bar_height = 25
-        bar_x = (self.width - bar_width) // 2
-        bar_y = 330
-        
-        # Background bar
-        draw.rectangle([bar_x, bar_y, bar_x + bar_width, bar_y + bar_height], 
-                      fill=bar_bg_color, outline=None)
-        
-        # Progress bar
-        progress_width = int(bar_width * (progress_percentage / 100))
-        draw.rectangle([bar_x, bar_y, bar_x + progress_width, bar_y + bar_height], 
-                      fill=progress_color, outline=None)
-        
-        # Additional info
-        years_left = life_expectancy - current_age
-        info_text = f"{years_left} years remaining (estimated)"
-        bbox = draw.textbbox((0, 0), info_text, font=font_small)
-        info_width = bbox[2] - bbox[0]
-        info_x = (self.width - info_width) // 2
-        draw.text((info_x, 380), info_text, font=font_small, fill=text_color)
-        
-        # Save image
-        base_filename = f"life_progress_{theme}.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Life progress image saved: {filepath}")
-        return filepath
+        if current_age > life_expectancy:
+            raise ValueError(f"Age {current_age} is past the life expectancy of {life_expectancy}")
+        progress_percentage = round_percentage(Fraction(current_age, life_expectancy),
+                                               rounding or self.rounding)
+        return {
+            'birth_year': birth_year,
+            'life_expectancy': life_expectancy,
+            'current_age': current_age,
+            'years_left': life_expectancy - current_age,
+            'progress_percentage': progress_percentage,
+            'progress': progress_percentage / 100,
+        }
+    
+    def generate_life_progress(self, birth_year, life_expectancy, theme='light',
+                               output='file', format=None, buffer=None, tz=None, rounding=None,
+                               sizes=None):
+        """Generate life progress image"""
+        current_year = current_time(tz or self.timezone).year
+        inputs = self.life_progress_inputs(birth_year, life_expectancy, current_year, rounding)
+        return self.generate_template('life_progress', theme, output, format, buffer,
+                                      sizes=sizes, **inputs)
+    
+    def render_life_progress(self, birth_year, life_expectancy, current_year, theme='light'):
+        """Draw a life progress cover and return the image"""
+        inputs = self.life_progress_inputs(birth_year, life_expectancy, current_year)
+        return self.render_template('life_progress', theme, **inputs)
     
-    def generate_motivational_text(self, text, theme='light'):
+    def generate_motivational_text(self, text, theme='light', output='file', format=None,
+                                   buffer=None, sizes=None):
         """Generate a custom motivational text image"""
-        # Choose colors based on theme
-        if theme == 'dark':
-            bg_color1 = (30, 35, 50)
-            bg_color2 = (50, 55, 70)
-            text_color = (255, 255, 255)
-        else:
-            bg_color1 = (240, 245, 250)
-            bg_color2 = (250, 250, 255)
-            text_color = (50, 50, 50)
-        
-        # Create gradient background
-        image = self.create_gradient_background(bg_color1, bg_color2)
-        draw = ImageDraw.Draw(image)
-        
-        # Font
-        font = self.get_font('NewYork.ttf', 36)
-        
-        # Wrap text
-        lines = textwrap.wrap(text, width=40)
-        line_height = 55
-        total_height = len(lines) * line_height
-        start_y = (self.height - total_height) // 2
-        
-        # Draw each line centered
-        for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x = (self.width - text_width) // 2
-            y = start_y + i * line_height
-            draw.text((x, y), line, font=font, fill=text_color)
-        
-        # Save image
-        base_filename = f"motivational_text_{theme}.png"
-        unique_filename = self.get_unique_filename(base_filename)
-        filepath = os.path.join(self.output_dir, unique_filename)
-        image.save(filepath)
-        print(f"✓ Motivational text image saved: {filepath}")
-        return filepath
\ No newline at end of file
+        return self.generate_template('motivational_text', theme, output, format, buffer,
+                                      sizes=sizes, text=text)
+    
+    def render_motivational_text(self, text, theme='light'):
+        """Draw a custom motivational text cover and return the image"""
+        return self.render_template('motivational_text', theme, text=text)
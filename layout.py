@@ -0,0 +1,541 @@
+from PIL import Image, ImageDraw
+from collections import OrderedDict
+import copy
+from string import Formatter
+import json
+import os
+import threading
+from text_layout import fit_text, get_sprite_cache
+from themes import THEME_ROLES, Palette
+from tracing import NullTracer
+
+ELEMENT_TYPES = ('text', 'bar')
+
+# Template coordinates are written for this canvas and scaled to the one being rendered
+REFERENCE_SIZE = (1500, 600)
+
+# Theme of templates that do not name a fallback_theme
+DEFAULT_THEME = 'light'
+
+_NULL_TRACER = NullTracer()
+
+
+def template_fields(text):
+    """Return the placeholder names used by a format string"""
+    return {field for _, field, _, _ in Formatter().parse(text) if field}
+
+
+def spec_fields(spec):
+    """Return every input name a template's elements read"""
+    fields = set()
+    for element in spec['elements']:
+        if element['type'] == 'text':
+            fields |= template_fields(element['text'])
+        elif element['type'] == 'bar':
+            fields.add(element['value'])
+    return fields
+
+
+class Scale:
+    """Maps template coordinates from the reference canvas to the rendered one
+
+    Lengths (font sizes, widths, gaps) follow the canvas width and vertical positions
+    follow its height. A string like "40%" is a fraction of the canvas width or height.
+    """
+
+    def __init__(self, size, reference=REFERENCE_SIZE):
+        self.size = tuple(size)
+        self.reference = tuple(reference)
+        self.x = self.size[0] / self.reference[0]
+        self.y = self.size[1] / self.reference[1]
+
+    def length(self, value):
+        """Scale a horizontal length or size"""
+        if value is None:
+            return None
+        if isinstance(value, str) and value.endswith('%'):
+            return round(float(value[:-1]) * self.size[0] / 100)
+        return round(value * self.x)
+
+    def top(self, value):
+        """Scale a vertical position, leaving keywords like 'center' untouched"""
+        if isinstance(value, str):
+            if value.endswith('%'):
+                return round(float(value[:-1]) * self.size[1] / 100)
+            return value
+        return round(value * self.y)
+
+    def font(self, font):
+        """Scale a (font file, size) pair"""
+        font_name, size = font
+        return font_name, max(1, self.length(size))
+
+
+class TextElement:
+    """A block of centered text, wrapped to a pixel width and shrunk to fit if allowed"""
+
+    def __init__(self, spec, font_specs, fonts, palette, scale):
+        self.text = spec['text']
+        self.font_name, self.font_size = font_specs[spec['font']]
+        self.fonts = fonts
+        self.color_key = spec['color']
+        self.color = palette[self.color_key]
+        self.max_width = scale.length(spec.get('max_width'))
+        self.max_lines = spec.get('max_lines')
+        self.min_size = scale.length(spec.get('min_size'))
+        self.max_height = scale.length(spec.get('max_height'))
+        self.line_height = scale.length(spec.get('line_height', 0))
+        self.y = scale.top(spec.get('y', 'after'))
+        self.gap = scale.length(spec.get('gap', 0))
+        self.reserve = scale.length(spec.get('reserve', 0))
+        self.fields = template_fields(self.text)
+        self.static = not self.fields
+        self.static_layout = None
+        # 'base' marks text whose inputs rarely change so it is baked into the base layer
+        self.bakeable = self.static or spec.get('layer') == 'base'
+        self.baked = False
+        self.has_base = False
+
+    def recolor(self, palette):
+        """Return a copy drawn in another palette, sharing the text layout"""
+        element = copy.copy(self)
+        element.color = palette[self.color_key]
+        return element
+
+    def precompute(self, size):
+        """Lay out static text once, at compile time"""
+        if self.static:
+            self.static_layout = self.layout(size, self.text)
+
+    def available_height(self, height):
+        """Return how tall the text may be without running off a canvas of this height"""
+        if self.max_height:
+            return self.max_height
+        top = self.y if isinstance(self.y, int) else 0
+        return height - top - self.reserve
+
+    def layout(self, size, text, tracer=_NULL_TRACER):
+        """Fit text to the element's width and the free height on a canvas of the given size"""
+        return fit_text(text, self.font_name, self.font_size, self.fonts,
+                        self.max_width or size[0], self.line_height,
+                        self.max_lines, self.min_size, tracer=tracer,
+                        max_height=self.available_height(size[1]))
+
+    def prepare(self, size, inputs, tracer=_NULL_TRACER):
+        """Lay out the text for a render (static text was laid out at compile time)"""
+        if self.static_layout is not None:
+            return self.static_layout
+        return self.layout(size, self.text.format(**inputs), tracer)
+
+    def render(self, draw, size, inputs, previous, prepared=None):
+        """Draw the element and return (y, height) for the element that follows"""
+        width, height = size
+        layout = prepared or self.prepare(size, inputs)
+
+        if self.y == 'center':
+            y = (height - layout.height - self.reserve) // 2
+        elif self.y == 'after':
+            y = previous[0] + previous[1] + self.gap
+        else:
+            y = self.y
+
+        sprites = get_sprite_cache()
+        for line, x, line_y in layout.positions(width, y):
+            sprites.draw(draw, (x, line_y), line, layout, self.color)
+        return y, layout.height
+
+    def render_base(self, draw, size, inputs, previous):
+        """Draw the part of the element that belongs to the base layer"""
+        return self.render(draw, size, inputs, previous)
+
+
+class BarElement:
+    """A horizontal progress bar: a track and a fill proportional to an input value"""
+
+    def __init__(self, spec, font_specs, fonts, palette, scale):
+        self.width = scale.length(spec['width'])
+        self.height = scale.length(spec['height'])
+        self.y = scale.top(spec['y'])
+        self.value = spec['value']
+        self.track_key = spec['track']
+        self.fill_key = spec['fill']
+        self.track_color = palette[self.track_key]
+        self.fill_color = palette[self.fill_key]
+        self.static = False
+        self.x = None
+        # The track is part of the base layer, only the fill is drawn per render
+        self.fields = set()
+        self.bakeable = False
+        self.baked = False
+        self.has_base = True
+
+    def recolor(self, palette):
+        """Return a copy drawn in another palette"""
+        element = copy.copy(self)
+        element.track_color = palette[self.track_key]
+        element.fill_color = palette[self.fill_key]
+        return element
+
+    def precompute(self, size):
+        """Center the bar once, at compile time"""
+        self.x = (size[0] - self.width) // 2
+
+    def render_base(self, draw, size, inputs, previous):
+        """Draw the empty track, returning (y, height)"""
+        x, y = self.x, self.y
+        draw.rectangle([x, y, x + self.width, y + self.height],
+                       fill=self.track_color, outline=None)
+        return y, self.height
+
+    def prepare(self, size, inputs, tracer=_NULL_TRACER):
+        """Bars need no layout"""
+        return None
+
+    def render(self, draw, size, inputs, previous, prepared=None):
+        """Draw the fill on top of the track, returning (y, height)"""
+        x, y = self.x, self.y
+        fill_width = int(self.width * inputs[self.value])
+        draw.rectangle([x, y, x + fill_width, y + self.height],
+                       fill=self.fill_color, outline=None)
+        return y, self.height
+
+
+ELEMENT_CLASSES = {
+    'text': TextElement,
+    'bar': BarElement,
+}
+
+
+class RenderPlan:
+    """A template compiled for one theme and canvas size, ready to render many times
+
+    Everything that does not change between renders (background, static text, bar tracks)
+    is drawn once into a cached base layer; a render copies it and draws the rest on top.
+    Template coordinates are scaled from the template's reference_size to the canvas.
+    """
+
+    def __init__(self, spec, theme, size, fonts, gradients, max_base_layers=32, themes=None,
+                 palette=None):
+        self.name = spec['name']
+        self.size = tuple(size)
+        self.theme = resolve_theme(spec, theme, themes)
+        if palette is None:
+            palette = template_palette(spec, self.theme, themes)
+        self.palette = palette
+        self.gradients = gradients
+        self.background = spec['background']
+
+        self.scale = Scale(self.size, spec.get('reference_size', REFERENCE_SIZE))
+        font_specs = {alias: self.scale.font(font) for alias, font in spec['fonts'].items()}
+        self.font_specs = list(font_specs.values())
+
+        background = spec['background']
+        if background['type'] not in ('solid', 'gradient'):
+            raise ValueError(f"Unknown background type in {self.name}: {background['type']}")
+        self.background_type = background['type']
+        self.background_colors = self.resolve_background(palette)
+        self.gradient_mode = background.get('mode', 'vertical')
+
+        self.elements = []
+        for element in spec['elements']:
+            element_class = ELEMENT_CLASSES.get(element['type'])
+            if element_class is None:
+                raise ValueError(f"Unknown element type in {self.name}: {element['type']}")
+            self.elements.append(element_class(element, font_specs, fonts, palette, self.scale))
+
+        # Static text is laid out once, at compile time
+        for element in self.elements:
+            element.precompute(self.size)
+
+        # An element stacked 'after' another can only be baked if its predecessor is
+        previous_baked = True
+        self.base_fields = []
+        for element in self.elements:
+            element.baked = element.bakeable and (element.y != 'after' or previous_baked)
+            element.has_base = element.has_base or element.baked
+            if element.baked:
+                self.base_fields.extend(sorted(element.fields))
+            previous_baked = element.baked
+
+        self.max_base_layers = max_base_layers
+        self._base_layers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve_background(self, palette):
+        """Return the background colors of the plan in a palette"""
+        if self.background_type == 'solid':
+            return (palette[self.background['color']],)
+        return tuple(palette[key] for key in self.background['colors'])
+
+    def recolor(self, theme, palette):
+        """Return a plan for another theme that shares this plan's layout
+
+        Fonts, positions and the layout of static text stay as they are; only colors
+        change, so rendering one template in many themes measures its text once.
+        """
+        plan = copy.copy(self)
+        plan.theme = theme
+        plan.palette = palette
+        plan.background_colors = self.resolve_background(palette)
+        plan.elements = [element.recolor(palette) for element in self.elements]
+        plan._base_layers = OrderedDict()
+        plan._lock = threading.Lock()
+        return plan
+
+    def create_background(self):
+        """Return a fresh background canvas"""
+        if self.background_type == 'gradient':
+            color1, color2 = self.background_colors
+            return self.gradients.get(color1, color2, self.size, self.gradient_mode)
+        return Image.new('RGB', self.size, self.background_colors[0])
+
+    def base_layer(self, inputs, tracer=_NULL_TRACER):
+        """Return (image, positions) for the base layer matching the baked inputs"""
+        key = tuple(inputs[field] for field in self.base_fields)
+        with self._lock:
+            layer = self._base_layers.get(key)
+            if layer is not None:
+                self._base_layers.move_to_end(key)
+                tracer.count('base_layer_hits')
+                return layer
+        tracer.count('base_layer_misses')
+
+        with tracer.span('background'):
+            image = self.create_background()
+        draw = ImageDraw.Draw(image)
+        previous = (0, 0)
+        positions = []
+        for element in self.elements:
+            position = None
+            if element.has_base:
+                position = element.render_base(draw, self.size, inputs, previous)
+            if element.baked:
+                previous = position
+            positions.append(position)
+        layer = (image, positions)
+
+        with self._lock:
+            self._base_layers[key] = layer
+            while len(self._base_layers) > self.max_base_layers:
+                self._base_layers.popitem(last=False)
+        return layer
+
+    def render(self, inputs, tracer=_NULL_TRACER, pool=None):
+        """Draw the template with the given inputs and return the image
+
+        With a CanvasPool the image is drawn on a recycled canvas, which the caller
+        must give back with pool.release() once it is encoded.
+        """
+        with tracer.span('base'):
+            base, positions = self.base_layer(inputs, tracer)
+        with tracer.span('layout'):
+            prepared = [None if element.baked else element.prepare(self.size, inputs, tracer)
+                        for element in self.elements]
+        with tracer.span('draw'):
+            if pool is not None:
+                image = pool.acquire(base.mode, base.size, source=base)
+            else:
+                image = base.copy()
+            try:
+                draw = ImageDraw.Draw(image)
+                previous = (0, 0)
+                for element, position, layout in zip(self.elements, positions, prepared):
+                    if element.baked:
+                        previous = position
+                    else:
+                        previous = element.render(draw, self.size, inputs, previous, layout)
+            except BaseException:
+                # Nobody else holds the canvas yet, so give it back before failing
+                if pool is not None:
+                    pool.release(image)
+                raise
+        return image
+
+
+def shrink(image, size):
+    """Downscale an image, using Image.reduce for exact integer factors"""
+    size = tuple(size)
+    if image.size == size:
+        return image
+    factor = image.width // size[0]
+    if factor > 1 and image.size == (size[0] * factor, size[1] * factor):
+        return image.reduce(factor)
+    return image.resize(size, Image.BILINEAR, reducing_gap=2.0)
+
+
+def resolve_theme(spec, theme, themes=None):
+    """Map a requested theme to a registry theme
+
+    No theme means the template's fallback; an unknown theme raises ValueError.
+    """
+    if theme is None:
+        return spec.get('fallback_theme', DEFAULT_THEME)
+    if themes is not None and theme in themes:
+        return theme
+    raise ValueError(f"Unknown theme for {spec['name']}: {theme}")
+
+
+def template_colors(spec):
+    """Return the color names a template draws with"""
+    background = spec['background']
+    colors = [background['color']] if 'color' in background else list(background.get('colors', ()))
+    for element in spec['elements']:
+        for key in ('color', 'track', 'fill'):
+            if key in element and element[key] not in colors:
+                colors.append(element[key])
+    return colors
+
+
+def template_palette(spec, theme, themes=None):
+    """Return the palette of a resolved theme for a template
+
+    Theme roles are mapped onto the template's color names through its "theme_roles",
+    e.g. {"character": "highlight"}, then the theme's colors for this template apply.
+    """
+    name = f"{spec['name']}:{theme}"
+    palette = themes.get(theme).select(template_colors(spec), spec.get('theme_roles'), name)
+    overrides = themes.overrides(theme, spec['name'])
+    if not overrides:
+        return palette
+    unknown = sorted(set(overrides) - set(palette))
+    if unknown:
+        raise ValueError(f"Theme {theme} sets colors {spec['name']} does not use: "
+                         f"{', '.join(unknown)}")
+    return Palette(name, dict(palette, **overrides))
+
+
+def validate_template(spec):
+    """Raise ValueError if a template spec is missing required parts"""
+    for key in ('name', 'background', 'fonts', 'elements'):
+        if key not in spec:
+            raise ValueError(f"Template {spec.get('name', '?')} is missing '{key}'")
+    if len(spec.get('reference_size', REFERENCE_SIZE)) != 2:
+        raise ValueError(f"Template {spec['name']} has an invalid reference_size")
+    colors = template_colors(spec)
+    roles = spec.get('theme_roles', {})
+    unmapped = [color for color in colors if roles.get(color, color) not in THEME_ROLES]
+    if unmapped:
+        raise ValueError(f"Colors of {spec['name']} without a theme role: {', '.join(unmapped)}")
+    for element in spec['elements']:
+        if element.get('type') not in ELEMENT_TYPES:
+            raise ValueError(f"Unknown element type in {spec['name']}: {element.get('type')}")
+        if element['type'] == 'text' and element['font'] not in spec['fonts']:
+            raise ValueError(f"Unknown font alias in {spec['name']}: {element['font']}")
+    return spec
+
+
+class TemplateEngine:
+    """Loads cover templates from JSON files and caches their compiled render plans
+
+    Plans are kept in an LRU of max_plans entries, because a scale can come from a
+    request and every plan holds pre-rendered base layers.
+    """
+
+    def __init__(self, templates_dir, fonts, gradients, themes=None, max_plans=64):
+        self.templates_dir = templates_dir
+        self.fonts = fonts
+        self.gradients = gradients
+        self.themes = themes
+        self.max_plans = max_plans
+        self._specs = None
+        self._plans = OrderedDict()
+        self._layouts = OrderedDict()
+        self._palettes = {}
+        self._lock = threading.Lock()
+
+    def _load_specs(self):
+        specs = {}
+        if os.path.isdir(self.templates_dir):
+            for filename in sorted(os.listdir(self.templates_dir)):
+                if filename.endswith('.json'):
+                    with open(os.path.join(self.templates_dir, filename), 'r', encoding='utf-8') as f:
+                        spec = validate_template(json.load(f))
+                    specs[spec['name']] = spec
+        self._specs = specs
+
+    def names(self):
+        """Return the names of every available template"""
+        with self._lock:
+            if self._specs is None:
+                self._load_specs()
+            return list(self._specs)
+
+    def get_spec(self, name):
+        """Return the raw template spec for a cover type"""
+        with self._lock:
+            if self._specs is None:
+                self._load_specs()
+            spec = self._specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown template: {name}")
+        return spec
+
+    def register(self, spec):
+        """Add or replace a template from a spec dict"""
+        validate_template(spec)
+        with self._lock:
+            if self._specs is None:
+                self._load_specs()
+            self._specs[spec['name']] = spec
+            self._plans = OrderedDict((key, plan) for key, plan in self._plans.items()
+                                      if key[0] != spec['name'])
+            self._layouts = OrderedDict((key, plan) for key, plan in self._layouts.items()
+                                        if key[0] != spec['name'])
+            self._palettes = {key: palette for key, palette in self._palettes.items()
+                              if key[0] != spec['name']}
+
+    def reload(self):
+        """Forget every spec, plan and palette so edited templates and themes are re-read"""
+        with self._lock:
+            self._specs = None
+            self._plans = OrderedDict()
+            self._layouts = OrderedDict()
+            self._palettes = {}
+
+    def theme_names(self, name):
+        """Return every theme a template can be rendered in"""
+        self.get_spec(name)
+        return self.themes.names() if self.themes is not None else []
+
+    def palette(self, name, theme):
+        """Return the cached palette of a template in a theme"""
+        spec = self.get_spec(name)
+        key = (name, resolve_theme(spec, theme, self.themes))
+        with self._lock:
+            palette = self._palettes.get(key)
+        if palette is None:
+            palette = template_palette(spec, key[1], self.themes)
+            with self._lock:
+                self._palettes[key] = palette
+        return palette
+
+    def compile(self, name, theme, size):
+        """Return the cached render plan for (template, theme, size)"""
+        spec = self.get_spec(name)
+        key = (name, resolve_theme(spec, theme, self.themes), tuple(size))
+        with self._lock:
+            plan = self._plans.get(key)
+            layout = self._layouts.get((name, key[2]))
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+        palette = self.palette(name, key[1])
+        if layout is not None:
+            # Another theme already laid this template out at this size
+            plan = layout.recolor(key[1], palette)
+        else:
+            plan = RenderPlan(spec, key[1], size, self.fonts, self.gradients,
+                              themes=self.themes, palette=palette)
+        with self._lock:
+            self._plans[key] = plan
+            self._layouts.setdefault((name, key[2]), plan)
+            self._layouts.move_to_end((name, key[2]))
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+            while len(self._layouts) > self.max_plans:
+                self._layouts.popitem(last=False)
+        return plan
+
+    def render(self, name, theme, size, inputs, tracer=_NULL_TRACER):
+        """Render a template straight to an image"""
+        return self.compile(name, theme, size).render(inputs, tracer)
@@ -6,7 +6,17 @@ A terminal-based image generator for Notion covers without external APIs.
 
 import os
 import sys
-from image_generator import ImageGenerator
+
+# Created on first render, so the menu shows up before Pillow and the fonts are loaded
+_generator = None
+
+def get_generator():
+    """Return the shared generator, importing and creating it on first use"""
+    global _generator
+    if _generator is None:
+        from image_generator import ImageGenerator
+        _generator = ImageGenerator()
+    return _generator
 
 def print_banner():
     """Print welcome banner"""
@@ -96,6 +106,7 @@ def generate_custom_text():
 def open_output_folder():
     """Open the output folder in file explorer"""
     output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+    os.makedirs(output_dir, exist_ok=True)
     
     try:
         if sys.platform == "win32":
@@ -109,9 +120,54 @@ def open_output_folder():
         print(f"❌ Could not open folder automatically: {e}")
         print(f"📁 Your images are saved in: {output_dir}")
 
-def main():
-    """Main program loop"""
-    generator = ImageGenerator()
+def parse_args(argv):
+    """Parse the one-shot command line options"""
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Generate Notion covers. Without options, starts the interactive menu.")
+    parser.add_argument('--generate', metavar='TYPE',
+                        help="render one cover and exit, e.g. year_progress or stoic_quote")
+    parser.add_argument('--theme', help="theme name, e.g. light, dark or one from themes.json")
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help="generator parameter, e.g. --set birth_year=1990 (repeatable)")
+    parser.add_argument('--format', help="encoder preset, e.g. png, png-fast, webp")
+    parser.add_argument('--stdout', action='store_true',
+                        help="write the encoded cover to stdout instead of the output folder")
+    args = parser.parse_args(argv)
+    if args.generate is None:
+        parser.error("--generate is required when options are given")
+    return args
+
+def generate_once(args):
+    """Render a single cover from the command line and return the exit code"""
+    from params import parse_assignments
+    try:
+        params = parse_assignments(args.set)
+    except ValueError as e:
+        print(f"❌ --set {e}", file=sys.stderr)
+        return 2
+    if args.format:
+        params['format'] = args.format
+    kind = args.generate.replace('-', '_')
+    
+    from image_generator import ImageGenerator
+    generator = ImageGenerator(verbose=not args.stdout)
+    try:
+        if args.stdout:
+            sys.stdout.buffer.write(generator.generate(kind, args.theme, output='bytes', **params))
+        else:
+            generator.generate(kind, args.theme, **params)
+    except (TypeError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    return 0
+
+def main(argv=None):
+    """Main program loop, or a one-shot render when options are given"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        # argparse is only imported for one-shot runs, the menu starts without it
+        return generate_once(parse_args(argv))
     
     print_banner()
     
@@ -128,38 +184,38 @@ def main():
                 
             elif choice == '1':
                 print("\n🔮 Generating dark stoic quote...")
-                generator.generate_stoic_quote('dark')
+                get_generator().generate_stoic_quote('dark')
                 
             elif choice == '2':
                 print("\n☀️ Generating light stoic quote...")
-                generator.generate_stoic_quote('light')
+                get_generator().generate_stoic_quote('light')
                 
             elif choice == '3':
                 print("\n🎌 Generating anime quote...")
-                generator.generate_anime_quote()
+                get_generator().generate_anime_quote()
                 
             elif choice == '4':
                 print("\n📚 Generating light book recommendation...")
-                generator.generate_book_recommendation('light')
+                get_generator().generate_book_recommendation('light')
                 
             elif choice == '5':
                 print("\n📖 Generating dark book recommendation...")
-                generator.generate_book_recommendation('dark')
+                get_generator().generate_book_recommendation('dark')
                 
             elif choice == '6':
                 print("\n📅 Generating light year progress...")
-                generator.generate_year_progress('light')
+                get_generator().generate_year_progress('light')
                 
             elif choice == '7':
                 print("\n🌙 Generating dark year progress...")
-                generator.generate_year_progress('dark')
+                get_generator().generate_year_progress('dark')
                 
             elif choice == '8':
                 result = generate_life_progress()
                 if result:
                     birth_year, life_expectancy, theme = result
                     print(f"\n⏳ Generating {theme} life progress...")
-                    generator.generate_life_progress(birth_year, life_expectancy, theme)
+                    get_generator().generate_life_progress(birth_year, life_expectancy, theme)
                 
             elif choice == '9':
                 result = generate_life_progress()
@@ -168,14 +224,14 @@ def main():
                     if theme == 'light':
                         theme = 'dark'  # Force dark theme for option 9
                     print(f"\n🌌 Generating {theme} life progress...")
-                    generator.generate_life_progress(birth_year, life_expectancy, theme)
+                    get_generator().generate_life_progress(birth_year, life_expectancy, theme)
                 
             elif choice == '10':
                 result = generate_custom_text()
                 if result:
                     text, theme = result
                     print(f"\n✨ Generating {theme} motivational text...")
-                    generator.generate_motivational_text(text, theme)
+                    get_generator().generate_motivational_text(text, theme)
                     
             elif choice == '11':
                 result = generate_custom_text()
@@ -184,7 +240,7 @@ def main():
                     if theme == 'light':
                         theme = 'dark'  # Force dark theme for option 11
                     print(f"\n🔥 Generating {theme} motivational text...")
-                    generator.generate_motivational_text(text, theme)
+                    get_generator().generate_motivational_text(text, theme)
                     
             elif choice == '12':
                 open_output_folder()
@@ -210,4 +266,4 @@ def main():
             print()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import re
+import threading
+
+# Matches "name.ext" and "name (3).ext"
+_NUMBERED = re.compile(r'^(?P<name>.*?)(?: \((?P<counter>\d+)\))?(?P<ext>\.[^.]*)?$')
+
+
+class OutputNamer:
+    """Hands out unique output filenames without probing the directory per counter"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._counters = None
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        """Seed the per-prefix counters from a single directory listing"""
+        counters = {}
+        if os.path.isdir(self.output_dir):
+            with os.scandir(self.output_dir) as entries:
+                for entry in entries:
+                    match = _NUMBERED.match(entry.name)
+                    key = (match.group('name'), match.group('ext') or '')
+                    counter = int(match.group('counter') or 0)
+                    if counter >= counters.get(key, -1):
+                        counters[key] = counter
+        self._counters = counters
+
+    def _try_create(self, filename):
+        """Atomically create an empty placeholder, returning False if it already exists"""
+        try:
+            fd = os.open(os.path.join(self.output_dir, filename),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def claim(self, base_filename):
+        """Reserve the next free "name (n).ext" filename and return it"""
+        name, ext = os.path.splitext(base_filename)
+        key = (name, ext)
+        with self._lock:
+            if self._counters is None:
+                self._scan()
+            # -1 means the bare base filename has not been used yet
+            counter = self._counters.get(key, -1) + 1
+            while True:
+                filename = base_filename if counter == 0 else f"{name} ({counter}){ext}"
+                if self._try_create(filename):
+                    self._counters[key] = counter
+                    return filename
+                # Another process got there first, move past its claim
+                counter += 1
+
+    def release(self, filename):
+        """Give back a claimed filename that was never written, removing its placeholder"""
+        try:
+            os.remove(os.path.join(self.output_dir, filename))
+        except FileNotFoundError:
+            pass
+        match = _NUMBERED.match(filename)
+        key = (match.group('name'), match.group('ext') or '')
+        counter = int(match.group('counter') or 0)
+        with self._lock:
+            # Only the latest claim can be handed out again; older gaps are simply skipped
+            if self._counters is not None and self._counters.get(key) == counter:
+                self._counters[key] = counter - 1
+
+    def content_filename(self, base_filename, data):
+        """Return a "name_<hash>.ext" filename derived from the encoded image bytes"""
+        name, ext = os.path.splitext(base_filename)
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        return f"{name}_{digest}{ext}"
+
+    def write_content(self, base_filename, data):
+        """Write bytes under a content-hash name; identical content maps to the same file"""
+        filename = self.content_filename(base_filename, data)
+        filepath = os.path.join(self.output_dir, filename)
+        if not os.path.exists(filepath):
+            temp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, filepath)
+        return filename
+
+    def reset(self):
+        """Forget the counters so the next claim rescans the directory"""
+        with self._lock:
+            self._counters = None
+
+
+_namers = {}
+_namers_lock = threading.Lock()
+
+
+def get_output_namer(output_dir):
+    """Return the process-wide namer for an output directory"""
+    output_dir = os.path.abspath(output_dir)
+    with _namers_lock:
+        namer = _namers.get(output_dir)
+        if namer is None:
+            namer = OutputNamer(output_dir)
+            _namers[output_dir] = namer
+        return namer
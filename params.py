@@ -0,0 +1,27 @@
+"""
+Cover parameters from text.
+CSV manifest cells, query strings and KEY=VALUE command line options all arrive as
+strings; these helpers turn them into generator arguments the same way everywhere.
+"""
+
+import json
+
+
+def parse_value(value):
+    """Convert a text value to a number when it looks like one"""
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return value
+    return parsed if isinstance(parsed, (int, float)) else value
+
+
+def parse_assignments(items):
+    """Turn ['birth-year=1990', ...] into {'birth_year': 1990}, raising ValueError if malformed"""
+    params = {}
+    for item in items:
+        key, separator, value = item.partition('=')
+        if not separator:
+            raise ValueError(f"expected KEY=VALUE, got: {item}")
+        params[key.replace('-', '_')] = parse_value(value)
+    return params
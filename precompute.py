@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Progress cover precomputation.
+Renders every year-progress day and a grid of life-progress ages ahead of time into
+indexed on-disk bundles, so requests for those covers become a lookup.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from layout import resolve_theme, spec_fields
+from progress import current_time, days_in_year
+
+BUNDLE_KINDS = ('year_progress', 'life_progress')
+DEFAULT_THEMES = ('light', 'dark')
+DEFAULT_LIFE_EXPECTANCIES = tuple(range(60, 101, 5))
+
+
+def bundle_key(fields, inputs):
+    """Return the lookup key for the inputs a template actually shows"""
+    return json.dumps({field: inputs[field] for field in fields}, sort_keys=True,
+                      separators=(',', ':'), default=str)
+
+
+class Bundle:
+    """One file of concatenated encoded covers plus a JSON index of their offsets"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.entries = meta['entries']
+
+    @classmethod
+    def load(cls, index_path):
+        """Read a bundle's index; the covers stay on disk until they are looked up"""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(os.path.splitext(index_path)[0] + '.bundle', meta)
+
+    def read(self, key):
+        """Return the encoded cover for a key, or None if the bundle doesn't have it"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+        except OSError:
+            return None
+        return data if len(data) == length else None
+
+
+def write_bundle(bundle_dir, name, meta, covers):
+    """Write (key, bytes) pairs as a bundle and its index, replacing any older version"""
+    os.makedirs(bundle_dir, exist_ok=True)
+    data_path = os.path.join(bundle_dir, name + '.bundle')
+    index_path = os.path.join(bundle_dir, name + '.json')
+    entries = {}
+    offset = 0
+    temp_path = f"{data_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        for key, data in covers:
+            f.write(data)
+            entries[key] = [offset, len(data)]
+            offset += len(data)
+    os.replace(temp_path, data_path)
+
+    meta = dict(meta, entries=entries, bytes=offset, created=time.time())
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(temp_path, index_path)
+    return Bundle(data_path, meta)
+
+
+class BundleStore:
+    """Answers cover requests from precomputed bundles in a directory
+
+    The directory is rescanned when its mtime changes, so bundles written by another
+    process (or a rollover) are picked up without a restart.
+    """
+
+    def __init__(self, bundle_dir, check_interval=1.0):
+        self.bundle_dir = bundle_dir
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._bundles = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.bundle_dir).st_mtime
+        except OSError:
+            self._bundles = {}
+            self._mtime = None
+            return
+        if mtime == self._mtime:
+            return
+        bundles = {}
+        for filename in sorted(os.listdir(self.bundle_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                bundle = Bundle.load(os.path.join(self.bundle_dir, filename))
+            except (OSError, ValueError):
+                continue
+            meta = bundle.meta
+            bundles.setdefault((meta['kind'], meta['theme'], meta['encoder']), []).append(bundle)
+        self._bundles = bundles
+        self._mtime = mtime
+
+    def lookup(self, kind, theme, encoder, fingerprint, inputs):
+        """Return precomputed bytes for a cover, or None if no fresh bundle has it"""
+        with self._lock:
+            self._refresh()
+            bundles = self._bundles.get((kind, theme, encoder), ())
+        for bundle in bundles:
+            # A bundle rendered with another template, font or encoder version is stale
+            if bundle.meta['fingerprint'] != fingerprint:
+                continue
+            data = bundle.read(bundle_key(bundle.meta['fields'], inputs))
+            if data is not None:
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def bundles(self):
+        """Return the metadata of every bundle, without the entry offsets"""
+        with self._lock:
+            self._refresh()
+            return [{key: value for key, value in bundle.meta.items() if key != 'entries'}
+                    for group in self._bundles.values() for bundle in group]
+
+    def stats(self):
+        """Return lookup counts and the number of bundles on disk"""
+        with self._lock:
+            self._refresh()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'bundles': sum(len(group) for group in self._bundles.values()),
+            }
+
+
+def year_progress_inputs(generator, year):
+    """Yield the inputs of every day of a year"""
+    total = days_in_year(year)
+    for days_passed in range(total):
+        yield generator.year_progress_inputs(year, days_passed, total)
+
+
+def life_progress_inputs(generator, life_expectancies):
+    """Yield the inputs of every age up to each life expectancy
+
+    Life covers show age and expectancy only, so one grid serves every birth year.
+    """
+    for life_expectancy in life_expectancies:
+        for age in range(life_expectancy + 1):
+            yield generator.life_progress_inputs(0, life_expectancy, age)
+
+
+def build_bundle(generator, kind, theme, period, inputs_list, encoder=None, bundle_dir=None):
+    """Render every distinct cover in inputs_list into one bundle and return it"""
+    spec = generator.templates.get_spec(kind)
+    theme = resolve_theme(spec, theme, generator.themes)
+    encoder = generator.get_encoder(kind, encoder)
+    fields = sorted(spec_fields(spec))
+    plan = generator.templates.compile(kind, theme, (generator.width, generator.height))
+
+    seen = set()
+    covers = []
+    for inputs in inputs_list:
+        key = bundle_key(fields, inputs)
+        if key in seen:
+            continue
+        seen.add(key)
+        image = plan.render(inputs, pool=generator.canvases)
+        try:
+            covers.append((key, encoder.encode(image)))
+        finally:
+            generator.canvases.release(image)
+
+    meta = {
+        'kind': kind,
+        'theme': theme,
+        'encoder': encoder.name,
+        'period': str(period),
+        'fields': fields,
+        'fingerprint': generator.cache_key(kind, {}, theme, encoder),
+    }
+    name = f"{kind}-{theme}-{encoder.name}-{period}"
+    return write_bundle(bundle_dir or generator.bundle_dir, name, meta, covers)
+
+
+def build_year_progress(generator, year, themes=DEFAULT_THEMES, encoder=None,
+                        bundle_dir=None):
+    """Precompute every day of a year for each theme"""
+    return [build_bundle(generator, 'year_progress', theme, year,
+                         year_progress_inputs(generator, year), encoder, bundle_dir)
+            for theme in themes]
+
+
+def build_life_progress(generator, life_expectancies=DEFAULT_LIFE_EXPECTANCIES,
+                        themes=DEFAULT_THEMES, encoder=None, bundle_dir=None):
+    """Precompute the grid of ages and life expectancies for each theme"""
+    return [build_bundle(generator, 'life_progress', theme, 'grid',
+                         life_progress_inputs(generator, life_expectancies), encoder,
+                         bundle_dir)
+            for theme in themes]
+
+
+def has_bundle(generator, kind, theme, period, encoder=None, bundle_dir=None):
+    """Return True if a bundle exists and was rendered with the current template and fonts"""
+    spec = generator.templates.get_spec(kind)
+    theme = resolve_theme(spec, theme, generator.themes)
+    encoder = generator.get_encoder(kind, encoder)
+    index_path = os.path.join(bundle_dir or generator.bundle_dir,
+                              f"{kind}-{theme}-{encoder.name}-{period}.json")
+    try:
+        meta = Bundle.load(index_path).meta
+    except (OSError, ValueError):
+        return False
+    return meta['fingerprint'] == generator.cache_key(kind, {}, theme, encoder)
+
+
+def rollover(generator, now=None, themes=DEFAULT_THEMES, encoder=None, ahead_days=7,
+             bundle_dir=None):
+    """Make sure this year's bundles exist, prepare next year's early and drop past years
+
+    Returns the list of periods that were built.
+    """
+    now = now or current_time(generator.timezone)
+    bundle_dir = bundle_dir or generator.bundle_dir
+    years = [now.year]
+    if (datetime(now.year + 1, 1, 1, tzinfo=now.tzinfo) - now).days < ahead_days:
+        years.append(now.year + 1)
+
+    built = []
+    for year in years:
+        missing = [theme for theme in themes
+                   if not has_bundle(generator, 'year_progress', theme, year, encoder, bundle_dir)]
+        if missing:
+            build_year_progress(generator, year, missing, encoder, bundle_dir)
+            built.append(year)
+
+    if os.path.isdir(bundle_dir):
+        for filename in os.listdir(bundle_dir):
+            if not filename.startswith('year_progress-'):
+                continue
+            period = os.path.splitext(filename)[0].rsplit('-', 1)[-1]
+            if period.isdigit() and int(period) < now.year:
+                try:
+                    os.remove(os.path.join(bundle_dir, filename))
+                except OSError:
+                    pass
+    return built
+
+
+class RolloverScheduler:
+    """Background thread that calls rollover() hourly and right after every new year
+
+    The year boundary is midnight in the generator's time zone.
+    """
+
+    def __init__(self, generator, themes=DEFAULT_THEMES, encoder=None, check_interval=3600,
+                 on_rollover=None):
+        self.generator = generator
+        self.themes = themes
+        self.encoder = encoder
+        self.check_interval = check_interval
+        self.on_rollover = on_rollover
+        self._stop = threading.Event()
+        self._thread = None
+
+    def seconds_until_new_year(self, now=None):
+        """Return the seconds left until the next year boundary"""
+        now = now or current_time(self.generator.timezone)
+        return (datetime(now.year + 1, 1, 1, tzinfo=now.tzinfo) - now).total_seconds()
+
+    def run_once(self):
+        """Run one rollover and report what was built"""
+        built = rollover(self.generator, themes=self.themes, encoder=self.encoder)
+        if built and self.on_rollover:
+            self.on_rollover(built)
+        return built
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            wait = min(self.check_interval, self.seconds_until_new_year() + 1)
+            self._stop.wait(wait)
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='progress-rollover',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    """Command line entry point"""
+    from image_generator import ImageGenerator
+
+    parser = argparse.ArgumentParser(description="Precompute year and life progress covers.")
+    parser.add_argument('--year', type=int, default=None,
+                        help="year to precompute (default: the current year)")
+    parser.add_argument('--themes', nargs='+', default=list(DEFAULT_THEMES),
+                        help="themes to precompute (default: light dark)")
+    parser.add_argument('--life-expectancy', type=int, nargs='+',
+                        default=list(DEFAULT_LIFE_EXPECTANCIES),
+                        help="life expectancies to precompute (default: 60 65 ... 100)")
+    parser.add_argument('--encoder', default=None,
+                        help="encoder preset to store the covers with (default: png)")
+    parser.add_argument('--schedule', action='store_true',
+                        help="keep running and roll the year bundle over at every new year")
+    args = parser.parse_args(argv)
+
+    generator = ImageGenerator(verbose=False)
+    generator.warm_fonts()
+    year = args.year or current_time(generator.timezone).year
+
+    start = time.perf_counter()
+    bundles = build_year_progress(generator, year, args.themes, args.encoder)
+    bundles += build_life_progress(generator, args.life_expectancy, args.themes, args.encoder)
+    for bundle in bundles:
+        meta = bundle.meta
+        print(f"✓ {meta['kind']} {meta['theme']} {meta['period']}: "
+              f"{len(meta['entries'])} covers, {meta['bytes'] / 1024:.0f} KB")
+    print(f"\n📊 Precomputed {len(bundles)} bundles in {time.perf_counter() - start:.1f}s "
+          f"into {generator.bundle_dir}")
+
+    if args.schedule:
+        scheduler = RolloverScheduler(
+            generator, args.themes, args.encoder,
+            on_rollover=lambda built: print(f"✓ Rolled over year progress bundles: {built}"))
+        print("⏰ Waiting for the next year boundary (Ctrl+C to stop)")
+        try:
+            scheduler.start()
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import calendar
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from fractions import Fraction
+from functools import lru_cache
+import math
+
+PERIODS = ('year', 'quarter', 'month', 'week', 'custom')
+ROUNDING_MODES = ('floor', 'nearest', 'ceil')
+
+Progress = namedtuple('Progress', [
+    'period',      # 'year', 'quarter', 'month', 'week' or 'custom'
+    'label',       # human readable name of the period, e.g. '2026' or 'Q3 2026'
+    'start',       # first day of the period
+    'end',         # first day after the period
+    'elapsed',     # whole days passed since start
+    'total',       # days in the period
+    'fraction',    # elapsed / total as an exact Fraction
+    'percentage',  # fraction as a rounded whole percentage
+])
+
+
+def resolve_timezone(tz):
+    """Turn None, a tzinfo, 'UTC', 'local' or an IANA name like 'Europe/Berlin' into a tzinfo"""
+    if tz is None or tz == 'local':
+        return None
+    if not isinstance(tz, str):
+        return tz
+    if tz.upper() == 'UTC':
+        return timezone.utc
+    # Imported on first use: zoneinfo is a noticeable part of the CLI's cold start
+    try:
+        from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    except ImportError:  # Python < 3.9
+        raise ValueError(f"Time zone names need Python 3.9+ (zoneinfo): {tz}") from None
+    try:
+        return ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: {tz}") from None
+
+
+def current_time(tz=None):
+    """Return an aware datetime for now in a time zone (default: the system's local zone)"""
+    tz = resolve_timezone(tz)
+    return datetime.now(tz) if tz is not None else datetime.now().astimezone()
+
+
+def today(tz=None):
+    """Return the current date in a time zone"""
+    return current_time(tz).date()
+
+
+def days_in_year(year):
+    """Return 366 for leap years (Gregorian rules, so 2100 is not one) and 365 otherwise"""
+    return 366 if calendar.isleap(year) else 365
+
+
+def round_percentage(fraction, rounding='floor'):
+    """Turn a fraction into a whole percentage
+
+    'floor' never shows 100% before the period is over, 'nearest' rounds halves up and
+    'ceil' rounds up. Fractions are exact, so 7/100 is 7% in every mode.
+    """
+    # Floats go through their decimal repr so 0.29 counts as 29%, not 28.999...%
+    value = Fraction(str(fraction) if isinstance(fraction, float) else fraction) * 100
+    if rounding == 'floor':
+        return math.floor(value)
+    if rounding == 'ceil':
+        return math.ceil(value)
+    if rounding == 'nearest':
+        return math.floor(value + Fraction(1, 2))
+    raise ValueError(f"Unknown rounding mode: {rounding}")
+
+
+def period_bounds(period, day, start=None, end=None, week_start=0):
+    """Return (start, end, label) of the period containing day; end is exclusive
+
+    week_start is 0 for Monday through 6 for Sunday. 'custom' uses start and end.
+    """
+    if period == 'year':
+        return date(day.year, 1, 1), date(day.year + 1, 1, 1), str(day.year)
+    if period == 'quarter':
+        quarter = (day.month - 1) // 3
+        first = date(day.year, quarter * 3 + 1, 1)
+        following = (date(day.year + 1, 1, 1) if quarter == 3
+                     else date(day.year, quarter * 3 + 4, 1))
+        return first, following, f"Q{quarter + 1} {day.year}"
+    if period == 'month':
+        first = day.replace(day=1)
+        following = first + timedelta(days=calendar.monthrange(day.year, day.month)[1])
+        return first, following, f"{calendar.month_name[day.month]} {day.year}"
+    if period == 'week':
+        first = day - timedelta(days=(day.weekday() - week_start) % 7)
+        iso_year, iso_week, _ = first.isocalendar()[:3]
+        return first, first + timedelta(days=7), f"week {iso_week} of {iso_year}"
+    if period == 'custom':
+        if start is None or end is None:
+            raise ValueError("A custom period needs a start and an end date")
+        start, end = parse_date(start), parse_date(end)
+        if end <= start:
+            raise ValueError("A custom period must end after it starts")
+        return start, end, f"{start.isoformat()} to {(end - timedelta(days=1)).isoformat()}"
+    raise ValueError(f"Unknown period: {period}")
+
+
+def parse_date(value):
+    """Accept a date, a datetime or an ISO 'YYYY-MM-DD' string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Not an ISO date (YYYY-MM-DD): {value}") from None
+
+
+@lru_cache(maxsize=4096)
+def progress_on(day, period='year', rounding='floor', start=None, end=None, week_start=0):
+    """Return the Progress of a period on a given day
+
+    This is the one calendar computation every cover, batch run and precompute shares;
+    it is cached per (day, period, ...) so each distinct day is worked out once.
+    """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Unknown rounding mode: {rounding}")
+    first, following, label = period_bounds(period, day, start, end, week_start)
+    total = (following - first).days
+    elapsed = min(max((day - first).days, 0), total)
+    fraction = Fraction(elapsed, total)
+    return Progress(period, label, first, following, elapsed, total, fraction,
+                    round_percentage(fraction, rounding))
+
+
+def progress(period='year', tz=None, now=None, rounding='floor', start=None, end=None,
+             week_start=0):
+    """Return the Progress of a period right now in a time zone
+
+    now may be a date or datetime to compute progress for another moment; an aware
+    datetime is converted to tz first so every server agrees on the day.
+    """
+    if now is None:
+        day = today(tz)
+    elif isinstance(now, datetime):
+        if now.tzinfo is not None and tz is not None:
+            now = now.astimezone(resolve_timezone(tz))
+        day = now.date()
+    else:
+        day = parse_date(now)
+    if start is not None:
+        start = parse_date(start)
+    if end is not None:
+        end = parse_date(end)
+    return progress_on(day, period, rounding, start, end, week_start)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def fingerprint_fonts(fonts_dir, fonts):
+    """Return (font file, size, file size, mtime) tuples so edited fonts invalidate the cache"""
+    result = []
+    for font_name, size in fonts:
+        try:
+            stat = os.stat(os.path.join(fonts_dir, font_name))
+            result.append((font_name, size, stat.st_size, int(stat.st_mtime)))
+        except OSError:
+            result.append((font_name, size, None, None))
+    return result
+
+
+class RenderCache:
+    """Content-addressed on-disk cache of encoded covers with a size cap and LRU eviction"""
+
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(generator, inputs, theme, fonts, size, extra=None):
+        """Return a canonical hash of everything that determines a cover's pixels"""
+        payload = {
+            'generator': generator,
+            'inputs': inputs,
+            'theme': theme,
+            'fonts': fonts,
+            'size': list(size),
+            'extra': extra,
+        }
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load_index(self):
+        """Build the in-memory index from a single walk of the cache directory"""
+        entries = {}
+        total = 0
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for filename in files:
+                    if filename.endswith('.tmp'):
+                        continue
+                    stat = os.stat(os.path.join(root, filename))
+                    entries[filename] = [stat.st_size, stat.st_mtime]
+                    total += stat.st_size
+        self._entries = entries
+        self._total_bytes = total
+
+    def get_path(self, key):
+        """Return the cached file path for a key, or None on a miss"""
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            entry = self._entries.get(key)
+            if entry is None or not os.path.exists(self._path(key)):
+                if entry is not None:
+                    self._total_bytes -= entry[0]
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            # The file mtime doubles as the LRU timestamp across restarts
+            entry[1] = time.time()
+            path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get_bytes(self, key):
+        """Return the cached encoded bytes for a key, or None on a miss"""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        """Store encoded bytes under a key and evict old entries past the size cap"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._entries[key] = [len(data), time.time()]
+            self._total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits its cap"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._total_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Delete every cached render"""
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            for key in list(self._entries):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._entries = {}
+            self._total_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counts and disk usage"""
+        with self._lock:
+            if self._entries is None:
+                self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+import hashlib
+import os
+import random
+import threading
+
+MASK64 = (1 << 64) - 1
+
+
+def _mix(value, key):
+    """splitmix64 finalizer used as the Feistel round function"""
+    z = (value + key + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def derive_seed(*parts):
+    """Turn any mix of ints and strings into a stable 64-bit seed"""
+    text = '\x1f'.join(str(part) for part in parts)
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+
+
+class Permutation:
+    """A seeded pseudo-random permutation of range(n) that uses O(1) memory
+
+    A small Feistel network shuffles the smallest even-bit power-of-two domain that
+    covers n; values that land outside range(n) are re-encrypted until they fall inside.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n, seed):
+        if n <= 0:
+            raise ValueError("Cannot permute an empty range")
+        self.n = n
+        bits = max((n - 1).bit_length(), 2)
+        self.half = (bits + 1) // 2
+        self.mask = (1 << self.half) - 1
+        self.keys = [derive_seed(seed, round_number) for round_number in range(self.ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self.half, value & self.mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right, key) & self.mask)
+        return (left << self.half) | right
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.n:
+            raise IndexError(position)
+        value = self._encrypt(position)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+
+class Sampler:
+    """Seeded, without-replacement sampling from corpora
+
+    Each (corpus, filters) stream walks a fresh permutation per pass, so every entry is
+    used once before any repeats. draw(position=k) is stateless, so separate processes
+    sharing a seed agree on what the k-th draw is.
+    """
+
+    def __init__(self, seed=None, max_permutations=64):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        self.seed = seed
+        self.max_permutations = max_permutations
+        self._positions = {}
+        self._permutations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _permutation(self, stream, n, epoch):
+        key = (stream, n, epoch)
+        with self._lock:
+            permutation = self._permutations.get(key)
+            if permutation is None:
+                permutation = Permutation(n, derive_seed(self.seed, stream, epoch))
+                self._permutations[key] = permutation
+                while len(self._permutations) > self.max_permutations:
+                    self._permutations.popitem(last=False)
+            else:
+                self._permutations.move_to_end(key)
+            return permutation
+
+    def index(self, stream, n, position):
+        """Return which of n items the position-th draw of a stream picks"""
+        epoch, offset = divmod(position, n)
+        return self._permutation(stream, n, epoch)[offset]
+
+    def next_position(self, stream):
+        """Return and advance this sampler's own position in a stream"""
+        with self._lock:
+            position = self._positions.get(stream, 0)
+            self._positions[stream] = position + 1
+            return position
+
+    def draw(self, corpus, position=None, **filters):
+        """Return the next (or the position-th) record of a corpus, without replacement"""
+        positions = corpus.candidates(**filters)
+        n = len(corpus) if positions is None else len(positions)
+        if n == 0:
+            described = ', '.join(f"{name}={value!r}" for name, value in filters.items())
+            raise ValueError(f"No entries in {os.path.basename(corpus.path)} match {described}")
+
+        stream = os.path.basename(corpus.path)
+        if filters:
+            stream += '?' + '&'.join(f"{name}={value}" for name, value in sorted(filters.items()))
+        if position is None:
+            position = self.next_position(stream)
+        index = self.index(stream, n, position)
+        return corpus.get(index if positions is None else positions[index])
+
+    def reset(self):
+        """Start every stream again from its first draw"""
+        with self._lock:
+            self._positions.clear()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Cover HTTP service.
+Serves every cover type over HTTP so covers can be embedded in Notion by URL,
+e.g. /year-progress?theme=dark or /motivational?text=Keep%20going
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from image_generator import SIZE_PRESETS, ImageGenerator
+from params import parse_value
+from tracing import Tracer, prometheus_text
+from workers import get_generator, make_executor
+
+# Short URL names for cover types whose full name is long
+ROUTE_ALIASES = {
+    'motivational': 'motivational_text',
+    'book': 'book_recommendation',
+}
+
+MAX_HEADER_LINES = 100
+
+
+def render_cover(kind, theme, inputs, format, size=None, ship_metrics=False):
+    """Render a resolved cover to bytes, returning (data, metrics snapshot or None)
+
+    Worker processes ship their metrics back with every render; threads share the
+    service's tracer.
+    """
+    generator = get_generator()
+    if size is None:
+        data = generator.generate_template(kind, theme, output='bytes', format=format,
+                                           **inputs)
+    else:
+        data = generator.generate_template(kind, theme, output='bytes', format=format,
+                                           sizes=[size], **inputs)[size]
+    snapshot = None
+    if ship_metrics:
+        snapshot = dict(generator.tracer.snapshot(), worker=os.getpid())
+        generator.tracer.reset()
+    return data, snapshot
+
+
+class Response:
+    """An HTTP response: status code, headers and body"""
+
+    def __init__(self, status, headers=None, body=b''):
+        self.status = HTTPStatus(status)
+        self.headers = headers or {}
+        self.body = body
+
+    def json(self):
+        """Decode a JSON body"""
+        return json.loads(self.body)
+
+    def encode(self, head_only=False, keep_alive=True):
+        """Serialize the response for the wire"""
+        headers = dict(self.headers)
+        headers['Content-Length'] = str(len(self.body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines = [f"HTTP/1.1 {self.status.value} {self.status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        return head if head_only else head + self.body
+
+
+def error_response(status, message, headers=None):
+    """Return a small JSON error response"""
+    body = json.dumps({'error': message}).encode('utf-8')
+    headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+    return Response(status, headers, body)
+
+
+def make_etag(key, size=None):
+    """Return a strong ETag derived from a cover's render cache key and output size"""
+    return '"' + hashlib.sha256(f"{key}:{size}".encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(header, etag):
+    """Return True if an If-None-Match header covers the given ETag"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    tags = [tag.strip() for tag in header.split(',')]
+    return etag in tags or f"W/{etag}" in tags
+
+
+class CoverService:
+    """Maps HTTP requests to cover renders on a bounded executor
+
+    At most max_pending renders are queued or running at once; requests beyond that
+    get 503 with Retry-After instead of piling up behind the executor.
+    """
+
+    def __init__(self, workers=None, max_pending=None, executor='process', cache=False,
+                 encoder='png', max_age=300, bundles=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.max_age = max_age
+        # Resolves requests to inputs and ETags; the executor's workers do the drawing
+        self.generator = ImageGenerator(verbose=False, encoder=encoder)
+        kinds = self.generator.templates.names()
+        self.routes = self.build_routes(kinds)
+        self.data_kinds = {kind for kind in kinds if self.generator.uses_data(kind)}
+        self.themes = self.generator.themes.names()
+        self.pending = 0
+        self.stats = {'requests': 0, 'rendered': 0, 'not_modified': 0, 'rejected': 0,
+                      'errors': 0}
+        self.tracer = Tracer()
+        self.tracer.add_collector('service', lambda: dict(self.stats, pending=self.pending))
+
+        self.ship_metrics = executor == 'process'
+        self.executor = make_executor(executor, self.workers, render_cache=cache,
+                                      encoder=encoder, bundles=bundles,
+                                      trace=self.ship_metrics,
+                                      tracer=None if self.ship_metrics else self.tracer)
+
+    @staticmethod
+    def build_routes(kinds):
+        """Return {url path: cover type} for every cover type"""
+        routes = {'/' + kind.replace('_', '-'): kind for kind in kinds}
+        for alias, kind in ROUTE_ALIASES.items():
+            if kind in kinds:
+                routes['/' + alias] = kind
+        return routes
+
+    def close(self):
+        """Shut down the render executor"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def cache_control(self, kind, params):
+        """Random picks must be revalidated, everything else can be cached for max_age"""
+        if kind in self.data_kinds and 'seed' not in params:
+            return 'no-cache'
+        return f"public, max-age={self.max_age}"
+
+    async def handle(self, method, target, headers=None):
+        """Answer one request and return a Response"""
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        self.stats['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return error_response(HTTPStatus.METHOD_NOT_ALLOWED, f"Method {method} not allowed",
+                                  {'Allow': 'GET, HEAD'})
+
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if path == '/':
+            body = json.dumps({'covers': sorted(self.routes),
+                               'themes': self.themes}).encode('utf-8')
+            return Response(HTTPStatus.OK, {'Content-Type': 'application/json'}, body)
+        if path == '/metrics':
+            return Response(HTTPStatus.OK, {'Content-Type': 'text/plain; version=0.0.4',
+                                            'Cache-Control': 'no-store'},
+                            prometheus_text(self.tracer).encode('utf-8'))
+        if path == '/health':
+            body = json.dumps(dict(self.stats, pending=self.pending,
+                                   max_pending=self.max_pending)).encode('utf-8')
+            return Response(HTTPStatus.OK, {'Content-Type': 'application/json',
+                                            'Cache-Control': 'no-store'}, body)
+
+        kind = self.routes.get(path)
+        if kind is None:
+            return error_response(HTTPStatus.NOT_FOUND, f"Unknown cover: {path}")
+
+        params = {name: parse_value(value) for name, value in parse_qsl(url.query)}
+        theme = params.pop('theme', None)
+        format = params.pop('format', None)
+        size = params.pop('size', None)
+        # Only named sizes: an arbitrary scale would let clients pick how much we render and cache
+        if size is not None and size not in SIZE_PRESETS:
+            self.stats['errors'] += 1
+            return error_response(HTTPStatus.BAD_REQUEST,
+                                  f"Unknown size: {size} (use one of {', '.join(SIZE_PRESETS)})")
+
+        # Resolving a cover is cheap, so a matching If-None-Match is answered without drawing
+        try:
+            cover = self.generator.generate(kind, theme, output='inputs', **params)
+            encoder = self.generator.get_encoder(cover['kind'], format)
+            key = self.generator.cache_key(cover['kind'], cover['inputs'], cover['theme'],
+                                           encoder)
+        except (TypeError, ValueError) as e:
+            self.stats['errors'] += 1
+            return error_response(HTTPStatus.BAD_REQUEST, str(e))
+        etag = make_etag(key, size)
+        response_headers = {'ETag': etag, 'Cache-Control': self.cache_control(kind, params)}
+        if etag_matches(headers.get('if-none-match'), etag):
+            self.stats['not_modified'] += 1
+            return Response(HTTPStatus.NOT_MODIFIED, response_headers)
+
+        if self.pending >= self.max_pending:
+            self.stats['rejected'] += 1
+            return error_response(HTTPStatus.SERVICE_UNAVAILABLE, "Render queue is full",
+                                  {'Retry-After': '1'})
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            data, snapshot = await loop.run_in_executor(
+                self.executor, render_cover, cover['kind'], cover['theme'], cover['inputs'],
+                encoder.name, size, self.ship_metrics)
+            if snapshot is not None:
+                self.tracer.merge(snapshot, worker=snapshot['worker'])
+        except Exception as e:
+            # The request was valid, so anything that goes wrong drawing it is our fault
+            self.stats['errors'] += 1
+            return error_response(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+        finally:
+            self.pending -= 1
+
+        self.stats['rendered'] += 1
+        response_headers['Content-Type'] = f"image/{encoder.format.lower()}"
+        return Response(HTTPStatus.OK, response_headers, data)
+
+    async def serve_connection(self, reader, writer, timeout=15):
+        """Answer requests on one keep-alive connection until the client is done"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                if len(parts) != 3:
+                    response = error_response(HTTPStatus.BAD_REQUEST, "Malformed request line")
+                    writer.write(response.encode(keep_alive=False))
+                    break
+                method, target, version = parts
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                response = await self.handle(method, target, headers)
+                writer.write(response.encode(head_only=method == 'HEAD', keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """Listen for HTTP connections until cancelled"""
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+class LocalClient:
+    """Calls a CoverService in-process, without sockets, for local testing"""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def request(self, method, path, headers=None):
+        """Send one request and return the Response"""
+        response = await self.service.handle(method, path, headers)
+        if method == 'HEAD':
+            response = Response(response.status, response.headers)
+        return response
+
+    async def get(self, path, headers=None):
+        """Send a GET request"""
+        return await self.request('GET', path, headers)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve Notion covers over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of render workers (default: CPU count)")
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process',
+                        help="render in worker processes or threads")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="renders queued before answering 503 (default: 4 per worker)")
+    parser.add_argument('--max-age', type=int, default=300,
+                        help="Cache-Control max-age for deterministic covers, in seconds")
+    parser.add_argument('--cache', action='store_true',
+                        help="reuse identical renders from the on-disk render cache")
+    parser.add_argument('--encoder', default='png',
+                        help="default encoder preset, e.g. png, png-palette, webp")
+    parser.add_argument('--precomputed', action='store_true',
+                        help="answer progress covers from bundles built by precompute.py")
+    args = parser.parse_args(argv)
+
+    service = CoverService(args.workers, args.max_pending, args.executor, args.cache,
+                           args.encoder, args.max_age, args.precomputed)
+    print(f"🌐 Serving covers on http://{args.host}:{args.port}/ "
+          f"({service.workers} {args.executor} workers)")
+    for path, kind in sorted(service.routes.items()):
+        print(f"   {path} → {kind}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped")
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,6 @@
 @echo off
 echo Starting notion-covers...
 REM Replace "YOUR_PROJECT_PATH" with the full path to your notion-covers folder
-REM Example: "C:\Users\YourName\Documents\notion-covers\.env\Scripts\python.exe" main.py
-"YOUR_PROJECT_PATH\.env\Scripts\python.exe" main.py
+REM Example: "C:\Users\YourName\Documents\notion-covers\.env\Scripts\python.exe" main.py %*
+"YOUR_PROJECT_PATH\.env\Scripts\python.exe" main.py %*
 pause
\ No newline at end of file
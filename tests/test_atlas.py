@@ -0,0 +1,14 @@
+import atlas
+
+
+def test_seeded_atlas_accepts_generate_prefix():
+    """'generate_'-prefixed entries become tiles with a seed instead of failing"""
+    entries = [
+        {'generator': 'generate_life_progress', 'birth_year': 1990, 'life_expectancy': 80},
+        {'generator': 'generate_stoic_quote'},
+        {'generator': 'stoic_quote'},
+    ]
+    sheet, index = atlas.build_atlas(entries, scale=0.1, seed=3)
+    assert index['failed'] == []
+    assert [tile['generator'] for tile in index['tiles']] == [
+        'life_progress', 'stoic_quote', 'stoic_quote']
@@ -0,0 +1,21 @@
+import batch
+
+
+def test_seeded_manifest_accepts_generate_prefix():
+    """'generate_'-prefixed entries render with a seed and share a stream with the short name"""
+    entries = [
+        {'generator': 'generate_life_progress', 'birth_year': 1990,
+         'life_expectancy': 80, 'output': 'image'},
+        {'generator': 'generate_stoic_quote', 'output': 'image'},
+        {'generator': 'stoic_quote', 'output': 'image'},
+    ]
+    indexes = batch.assign_sample_indexes(entries)
+    assert indexes == [0, 0, 1]
+
+    batch.init_worker(seed=7)
+    results = [batch.render_entry((index, entry, sample_index))
+               for index, (entry, sample_index) in enumerate(zip(entries, indexes))]
+    for index, ok, result, seconds in results:
+        assert ok, result
+    # One stream means the second stoic quote is a different pick, not a repeat
+    assert results[1][2].tobytes() != results[2][2].tobytes()
@@ -0,0 +1,73 @@
+from PIL import Image
+import pytest
+
+from canvas_pool import CanvasPool, canvas_bytes
+
+SIZE = (40, 10)
+NBYTES = canvas_bytes('RGB', SIZE)
+
+
+def test_released_canvases_are_reused_and_reset():
+    """A returned canvas is lent out again, repainted with the new fill"""
+    pool = CanvasPool()
+    first = pool.acquire('RGB', SIZE, fill=(255, 0, 0))
+    assert pool.release(first)
+    second = pool.acquire('RGB', SIZE, fill=(0, 0, 255))
+
+    assert second is first
+    assert second.getcolors() == [(SIZE[0] * SIZE[1], (0, 0, 255))]
+    stats = pool.stats()
+    assert (stats['allocated'], stats['reused'], stats['in_use']) == (1, 1, 1)
+    assert stats['in_use_bytes'] == NBYTES and stats['idle_bytes'] == 0
+
+
+def test_byte_counts_balance_after_every_release():
+    """In-use and idle bytes return to their totals; the peak is remembered"""
+    pool = CanvasPool()
+    canvases = [pool.acquire('RGB', SIZE) for _ in range(3)]
+    assert pool.stats()['peak_in_use_bytes'] == 3 * NBYTES
+    for image in canvases:
+        pool.release(image)
+
+    stats = pool.stats()
+    assert stats['in_use'] == 0 and stats['in_use_bytes'] == 0
+    assert stats['idle'] == 3 and stats['idle_bytes'] == 3 * NBYTES
+    assert stats['peak_in_use_bytes'] == 3 * NBYTES
+
+
+def test_foreign_and_detached_images_are_never_taken_back():
+    """Only canvases the pool lent out, and still owns, go back into it"""
+    pool = CanvasPool()
+    assert not pool.release(Image.new('RGB', SIZE))
+    image = pool.acquire('RGB', SIZE)
+    pool.detach(image)
+    assert not pool.release(image)
+
+    stats = pool.stats()
+    assert stats['in_use_bytes'] == 0 and stats['idle'] == 0
+
+
+def test_idle_memory_is_capped():
+    """Canvases past max_idle_bytes are discarded; trim frees the oldest sizes first"""
+    pool = CanvasPool(max_idle_bytes=2 * NBYTES)
+    canvases = [pool.acquire('RGB', SIZE) for _ in range(3)]
+    assert [pool.release(image) for image in canvases] == [True, True, False]
+    assert pool.stats()['discarded'] == 1
+
+    pool.trim(NBYTES)
+    assert pool.stats()['idle_bytes'] == NBYTES
+    # Draining a size completely must leave the pool usable for it
+    pool.trim()
+    image = pool.acquire('RGB', SIZE)
+    assert pool.stats()['allocated'] == 4
+    assert pool.release(image)
+
+
+def test_canvas_is_returned_when_the_block_raises():
+    """The context manager gives the canvas back even if drawing fails"""
+    pool = CanvasPool()
+    with pytest.raises(RuntimeError):
+        with pool.canvas('RGB', SIZE):
+            raise RuntimeError("draw failed")
+    stats = pool.stats()
+    assert stats['in_use'] == 0 and stats['idle'] == 1
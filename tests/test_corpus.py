@@ -0,0 +1,84 @@
+import json
+import os
+import random
+
+import pytest
+
+from corpus import Corpus
+
+BOOKS = [
+    {'title': 'Dune', 'author': 'Frank Herbert', 'year': 1965},
+    {'title': 'Emma', 'author': 'Jane Austen', 'year': 1815},
+    {'title': 'Persuasion', 'author': 'Jane Austen', 'year': 1817},
+    {'title': 'Neuromancer', 'author': 'William Gibson', 'year': 1984},
+]
+
+
+@pytest.fixture(params=['.json', '.jsonl'])
+def books(request, tmp_path):
+    """The same collection as a JSON array and as memory-mapped JSON lines"""
+    path = tmp_path / f'books{request.param}'
+    write_books(str(path), BOOKS)
+    if request.param == '.jsonl':
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('\n')
+    return Corpus(str(path), check_interval=0)
+
+
+def write_books(path, books):
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            f.write(''.join(json.dumps(book) + '\n' for book in books))
+        else:
+            json.dump(books, f)
+
+
+def test_records_and_positions(books):
+    """Records come back in file order, blank lines skipped"""
+    assert len(books) == 4
+    assert books.records() == BOOKS
+    assert books.get(2) == BOOKS[2]
+
+
+def test_equality_filters_ignore_case(books):
+    """String lookups are case-insensitive; no filters means every record"""
+    assert books.candidates(author='jane austen') == [1, 2]
+    assert books.candidates(author='Nobody') == []
+    assert books.candidates() is None
+
+
+def test_range_filters_combine_with_equality(books):
+    """Range operators bisect the numeric index and intersect with other filters"""
+    assert books.candidates(year__gt=1817) == [0, 3]
+    assert books.candidates(year__gte=1817) == [0, 2, 3]
+    assert books.candidates(year__lt=1817) == [1]
+    assert books.candidates(year__lte=1965, author='Jane Austen') == [1, 2]
+    with pytest.raises(ValueError):
+        books.candidates(year__near=1900)
+
+
+def test_sampling_stays_inside_the_filter(books):
+    """Filtered samples only ever return matching records"""
+    rng = random.Random(1)
+    picks = {books.sample(rng, author='Jane Austen')['title'] for _ in range(50)}
+    assert picks == {'Emma', 'Persuasion'}
+    with pytest.raises(ValueError, match='No entries'):
+        books.sample(rng, year__gt=2000)
+
+
+def test_contains_checks_record_and_filters(books):
+    """A record is found only if it is unchanged and matches the filters"""
+    assert books.contains(BOOKS[1])
+    assert books.contains(BOOKS[1], year__lt=1900)
+    assert not books.contains(BOOKS[1], year__gt=1900)
+    assert not books.contains(dict(BOOKS[1], year=1816))
+
+
+def test_edits_rebuild_the_indexes(books):
+    """Changing the file reloads the records and drops cached candidates"""
+    assert books.candidates(author='Frank Herbert') == [0]
+    write_books(books.path, BOOKS[2:])
+    os.utime(books.path, ns=(1, 1))
+    assert len(books) == 2
+    assert books.candidates(author='Frank Herbert') == []
+    assert books.candidates(author='Jane Austen') == [0]
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from image_generator import ImageGenerator
+from naming import OutputNamer
+
+
+def test_claims_continue_after_existing_files(tmp_path):
+    """The counter starts past the highest "name (n).ext" already in the folder"""
+    (tmp_path / 'cover.png').write_bytes(b'')
+    (tmp_path / 'cover (2).png').write_bytes(b'')
+    namer = OutputNamer(str(tmp_path))
+
+    assert namer.claim('cover.png') == 'cover (3).png'
+    assert namer.claim('other.png') == 'other.png'
+    assert (tmp_path / 'cover (3).png').exists()
+
+
+def test_concurrent_namers_never_share_a_filename(tmp_path):
+    """Namers that scanned the same folder (one per process) skip each other's claims"""
+    first = OutputNamer(str(tmp_path))
+    second = OutputNamer(str(tmp_path))
+    first.claim('warm.png')
+    second.claim('warm.png')
+
+    claims = []
+    for _ in range(5):
+        claims.append(first.claim('cover.png'))
+        claims.append(second.claim('cover.png'))
+    assert len(set(claims)) == len(claims)
+    assert sorted(os.listdir(tmp_path)) == sorted(claims + ['warm.png', 'warm (1).png'])
+
+
+def test_release_removes_the_placeholder_and_hands_the_name_out_again(tmp_path):
+    """Releasing the latest claim frees it for the next one"""
+    namer = OutputNamer(str(tmp_path))
+    assert namer.claim('cover.png') == 'cover.png'
+    assert namer.claim('cover.png') == 'cover (1).png'
+
+    namer.release('cover (1).png')
+    assert not (tmp_path / 'cover (1).png').exists()
+    assert namer.claim('cover.png') == 'cover (1).png'
+
+
+def test_failed_write_leaves_no_placeholder(tmp_path):
+    """A cover that cannot be written gives its claimed filename back"""
+    generator = ImageGenerator(verbose=False)
+    generator.output_dir = str(tmp_path)
+    generator.namer = OutputNamer(str(tmp_path))
+
+    with pytest.raises(TypeError):
+        generator.save_bytes('not bytes', 'cover.png')
+    assert os.listdir(tmp_path) == []
+    assert generator.save_bytes(b'data', 'cover.png') == str(tmp_path / 'cover.png')
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from image_generator import ImageGenerator
+from progress import days_in_year, progress, progress_on
+
+
+def test_2100_is_not_a_leap_year():
+    assert days_in_year(2100) == 365
+    assert days_in_year(2000) == 366
+    assert progress_on(date(2100, 12, 31)).total == 365
+
+
+def test_day_boundary_follows_the_time_zone():
+    """23:30 UTC on December 31 is already January 1 in Berlin"""
+    moment = datetime(2025, 12, 31, 23, 30, tzinfo=timezone.utc)
+    assert progress('year', 'UTC', moment).label == '2025'
+    berlin = progress('year', 'Europe/Berlin', moment)
+    assert berlin.label == '2026'
+    assert berlin.elapsed == 0
+
+
+def test_custom_period_end_is_exclusive():
+    custom = progress('custom', now='2026-09-10', start='2026-09-01', end='2026-09-11')
+    assert custom.total == 10
+    assert custom.elapsed == 9
+    assert custom.label == '2026-09-01 to 2026-09-10'
+    assert progress('custom', now='2026-09-11', start='2026-09-01',
+                    end='2026-09-11').percentage == 100
+
+
+@pytest.mark.parametrize('birth_year, life_expectancy, current_year', [
+    (1990, 0, 2026),
+    (1990, -5, 2026),
+    (2030, 80, 2026),
+    (1900, 80, 2026),
+    ('1990', 80, 2026),
+])
+def test_life_progress_rejects_invalid_inputs(birth_year, life_expectancy, current_year):
+    generator = ImageGenerator(verbose=False)
+    with pytest.raises(ValueError):
+        generator.life_progress_inputs(birth_year, life_expectancy, current_year)
+
+
+def test_life_progress_inputs():
+    inputs = ImageGenerator(verbose=False).life_progress_inputs(1990, 80, 2026)
+    assert inputs['current_age'] == 36
+    assert inputs['years_left'] == 44
+    assert inputs['progress_percentage'] == 45
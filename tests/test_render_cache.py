@@ -0,0 +1,65 @@
+import itertools
+import types
+
+import render_cache
+from image_generator import ImageGenerator
+from render_cache import RenderCache
+
+
+def test_put_then_get_is_a_hit(tmp_path):
+    """Stored bytes come back under the same key; unknown keys are misses"""
+    cache = RenderCache(str(tmp_path))
+    key = RenderCache.make_key('stoic_quote', {'quote': 'a'}, 'dark', [], (1500, 600))
+
+    assert cache.get_bytes(key) is None
+    cache.put(key, b'cover')
+    assert cache.get_bytes(key) == b'cover'
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    # A fresh instance rebuilds its index from the files on disk
+    assert RenderCache(str(tmp_path)).get_bytes(key) == b'cover'
+
+
+def test_key_changes_with_any_input():
+    """Inputs, theme, fonts, size and extra settings all take part in the key"""
+    base = ('stoic_quote', {'quote': 'a'}, 'dark', [('a.ttf', 20, 1, 1)], (1500, 600))
+    keys = {
+        RenderCache.make_key(*base),
+        RenderCache.make_key('stoic_quote', {'quote': 'b'}, *base[2:]),
+        RenderCache.make_key(*base[:2], 'light', *base[3:]),
+        RenderCache.make_key(*base[:3], [('a.ttf', 20, 1, 2)], base[4]),
+        RenderCache.make_key(*base[:4], (3000, 1200)),
+        RenderCache.make_key(*base, extra={'encoder': 'webp'}),
+    }
+    assert len(keys) == 6
+    assert RenderCache.make_key(*base) == RenderCache.make_key(*base)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    """Past the size cap the entry read longest ago is removed first"""
+    clock = itertools.count(1)
+    monkeypatch.setattr(render_cache, 'time', types.SimpleNamespace(time=lambda: next(clock)))
+    cache = RenderCache(str(tmp_path), max_bytes=10)
+
+    cache.put('a' * 64, b'1234')
+    cache.put('b' * 64, b'1234')
+    assert cache.get_bytes('a' * 64) == b'1234'
+    cache.put('c' * 64, b'1234')
+
+    assert cache.get_bytes('b' * 64) is None
+    assert cache.get_bytes('a' * 64) == b'1234'
+    assert cache.get_bytes('c' * 64) == b'1234'
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 2 and stats['bytes'] == 8
+
+
+def test_generator_reuses_identical_renders(tmp_path):
+    """A second identical cover is served from the cache, byte for byte"""
+    cache = RenderCache(str(tmp_path))
+    generator = ImageGenerator(verbose=False, render_cache=cache)
+
+    first = generator.generate('motivational_text', 'dark', output='bytes', text='Cached')
+    second = generator.generate('motivational_text', 'dark', output='bytes', text='Cached')
+    assert first == second
+    assert cache.stats()['hits'] == 1
+    generator.generate('motivational_text', 'dark', output='bytes', text='Other')
+    assert cache.stats()['entries'] == 2
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from corpus import Corpus
+from sampling import Permutation, Sampler
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5, 17, 100, 1000])
+def test_permutation_visits_every_index_once(n):
+    """The Feistel network is a bijection on range(n), whatever n is"""
+    permutation = Permutation(n, seed=42)
+    assert sorted(permutation[position] for position in range(n)) == list(range(n))
+
+
+def test_permutations_depend_on_the_seed():
+    """The same seed gives the same order, another seed a different one"""
+    first = [Permutation(100, seed=1)[position] for position in range(100)]
+    second = [Permutation(100, seed=2)[position] for position in range(100)]
+    assert first != second
+    assert first == [Permutation(100, seed=1)[position] for position in range(100)]
+
+
+@pytest.fixture
+def quotes(tmp_path):
+    path = tmp_path / 'quotes.json'
+    path.write_text(json.dumps([{'quote': f'Quote {index}', 'author': 'Seneca' if index % 3
+                                 else 'Epictetus'} for index in range(30)]))
+    return Corpus(str(path))
+
+
+def test_draws_use_every_entry_before_repeating(quotes):
+    """Each pass over the corpus is a full permutation, and passes differ"""
+    sampler = Sampler(seed=7)
+    first = [sampler.draw(quotes)['quote'] for _ in range(30)]
+    second = [sampler.draw(quotes)['quote'] for _ in range(30)]
+    assert len(set(first)) == 30
+    assert len(set(second)) == 30
+    assert first != second
+
+
+def test_filtered_streams_do_not_repeat(quotes):
+    """A filtered stream walks a permutation of the matching entries only"""
+    sampler = Sampler(seed=7)
+    picks = [sampler.draw(quotes, author='Epictetus') for _ in range(10)]
+    assert all(pick['author'] == 'Epictetus' for pick in picks)
+    assert len({pick['quote'] for pick in picks}) == 10
+
+
+def test_positions_agree_across_samplers(quotes):
+    """draw(position=k) is stateless, so workers sharing a seed pick the same k-th entry"""
+    sequential = Sampler(seed=11)
+    expected = [sequential.draw(quotes) for _ in range(40)]
+    other = Sampler(seed=11)
+    assert [other.draw(quotes, position) for position in reversed(range(40))] == expected[::-1]
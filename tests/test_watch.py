@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from corpus import CorpusStore
+from watch import CoverWatcher
+
+
+def test_generate_prefixed_spec_is_rendered(tmp_path):
+    """A spec naming 'generate_stoic_quote' resolves and renders like 'stoic_quote'"""
+    spec_dir = tmp_path / 'covers'
+    spec_dir.mkdir()
+    (spec_dir / 'quote.json').write_text(json.dumps({'generator': 'generate_stoic_quote'}))
+    watcher = CoverWatcher(str(spec_dir), output_dir=str(tmp_path),
+                           manifest_path=str(tmp_path / 'watch.json'))
+
+    results = watcher.sync()
+    assert results['failed'] == []
+    assert [name for name, path, reasons in results['rendered']] == ['quote']
+    assert watcher.sync()['unchanged'] == 1
+
+
+def make_watcher(tmp_path, specs):
+    spec_dir = tmp_path / 'covers'
+    spec_dir.mkdir()
+    for name, spec in specs.items():
+        (spec_dir / f'{name}.json').write_text(json.dumps(spec))
+    return CoverWatcher(str(spec_dir), output_dir=str(tmp_path),
+                        manifest_path=str(tmp_path / 'watch.json'))
+
+
+def test_picked_entry_survives_other_entries_changing(tmp_path):
+    """Adding or removing other quotes keeps each spec's pick and its cover"""
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    quotes = [f"Quote number {index}" for index in range(20)]
+    (data_dir / 'stoic_quotes.json').write_text(json.dumps(quotes))
+    watcher = make_watcher(tmp_path, {f'quote{index}': {'generator': 'stoic_quote'}
+                                      for index in range(5)})
+    watcher.generator.corpora = CorpusStore(str(data_dir))
+    watcher.generator.corpora.get('stoic_quotes.json').check_interval = 0
+
+    assert len(watcher.sync()['rendered']) == 5
+    picks = {name: record['entry'] for name, record in watcher.manifest['covers'].items()}
+
+    # Drop an entry nobody picked and add new ones in front of the rest
+    picked = {entry['quote'] for entry in picks.values()}
+    unused = next(quote for quote in quotes if quote not in picked)
+    quotes = ["A new quote", "Another new quote"] + [q for q in quotes if q != unused]
+    (data_dir / 'stoic_quotes.json').write_text(json.dumps(quotes))
+    os.utime(data_dir / 'stoic_quotes.json', ns=(1, 1))
+
+    results = watcher.sync()
+    assert results['rendered'] == [] and results['unchanged'] == 5
+    assert {name: record['entry'] for name, record in watcher.manifest['covers'].items()} == picks
+
+
+@pytest.mark.parametrize('filename', ['../escape.png', '/tmp/absolute.png', 'sub/dir.png', '..'])
+def test_filename_must_be_plain(tmp_path, filename):
+    """A spec cannot write outside the output directory"""
+    watcher = make_watcher(tmp_path, {'bad': {'generator': 'year_progress', 'filename': filename}})
+
+    results = watcher.sync()
+    assert results['rendered'] == []
+    assert [name for name, error in results['failed']] == ['bad']
+    assert 'plain file name' in results['failed'][0][1]
@@ -0,0 +1,280 @@
+from PIL import Image, ImageDraw
+from collections import OrderedDict
+import threading
+from tracing import NullTracer
+
+_NULL_TRACER = NullTracer()
+
+
+class GlyphMetrics:
+    """Cached glyph advances and kerning pairs for one (font file, size)"""
+
+    def __init__(self, font):
+        self.font = font
+        self._advances = {}
+        self._kerning = {}
+        self._lock = threading.Lock()
+
+    def advance(self, char):
+        """Return the horizontal advance of a single character"""
+        width = self._advances.get(char)
+        if width is None:
+            width = self.font.getlength(char)
+            with self._lock:
+                self._advances[char] = width
+        return width
+
+    def kerning(self, left, right):
+        """Return the kerning adjustment between two adjacent characters"""
+        pair = left + right
+        adjustment = self._kerning.get(pair)
+        if adjustment is None:
+            adjustment = self.font.getlength(pair) - self.advance(left) - self.advance(right)
+            with self._lock:
+                self._kerning[pair] = adjustment
+        return adjustment
+
+    def width(self, text):
+        """Return the advance width of a string from the cached glyph metrics"""
+        if not text:
+            return 0.0
+        total = self.advance(text[0])
+        for left, right in zip(text, text[1:]):
+            total += self.advance(right) + self.kerning(left, right)
+        return total
+
+
+class TextLayout:
+    """The result of fitting text to a width: lines, their widths and the chosen size"""
+
+    def __init__(self, lines, font, font_size, line_height, font_name=None, text=None):
+        self.lines = lines
+        self.text = text
+        self.font = font
+        self.font_name = font_name
+        self.font_size = font_size
+        self.line_height = line_height
+        self.height = len(lines) * line_height
+        self.width = max((width for _, width in lines), default=0)
+
+    def positions(self, canvas_width, y):
+        """Yield (line, x, y) for every line centered on the canvas"""
+        for i, (line, width) in enumerate(self.lines):
+            yield line, int(canvas_width - width) // 2, y + i * self.line_height
+
+
+class TextSprite:
+    """A line of text rasterized once: its alpha mask and its bounding box
+
+    bbox is (left, top, right, bottom) relative to the drawing position, the same box
+    ImageDraw.textbbox would return, so measuring a cached string costs nothing.
+    """
+
+    __slots__ = ('mask', 'bbox', 'nbytes')
+
+    def __init__(self, text, font):
+        self.bbox = font.getbbox(text)
+        left, top, right, bottom = self.bbox
+        width, height = right - left, bottom - top
+        self.mask = None
+        if width > 0 and height > 0:
+            # Drawing full ink onto black yields exactly the glyph coverage mask
+            self.mask = Image.new('L', (width, height), 0)
+            ImageDraw.Draw(self.mask).text((-left, -top), text, font=font, fill=255)
+        self.nbytes = max(width, 0) * max(height, 0)
+
+    def draw(self, draw, xy, fill):
+        """Paste the sprite in a color as draw.text(xy, text, fill=fill) would draw it"""
+        if self.mask is not None:
+            draw.bitmap((xy[0] + self.bbox[0], xy[1] + self.bbox[1]), self.mask, fill=fill)
+
+
+class SpriteCache:
+    """Process-wide LRU cache of text sprites keyed by (text, font file, size)
+
+    Repeated strings (attributions, labels, names, percentages) are rasterized once and
+    then drawn as a colorized paste. Memory is bounded by the total mask size in bytes.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_text=48):
+        self.max_bytes = max_bytes
+        # Long one-off strings (most quotes) are not worth keeping, nor are their lines
+        self.max_text = max_text
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text, font_name, size, font):
+        """Return the sprite of a string, rasterizing it on first use"""
+        key = (text, font_name, size)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+        sprite = TextSprite(text, font)
+        if len(text) > self.max_text or font_name is None or sprite.nbytes > self.max_bytes:
+            return sprite
+        with self._lock:
+            if key not in self._sprites:
+                self._sprites[key] = sprite
+                self.bytes += sprite.nbytes
+                while self.bytes > self.max_bytes:
+                    _, evicted = self._sprites.popitem(last=False)
+                    self.bytes -= evicted.nbytes
+                    self.evictions += 1
+        return sprite
+
+    def draw(self, draw, xy, text, layout, fill):
+        """Draw one line of a TextLayout, through the cache unless the whole text is long"""
+        if layout.text is not None and len(layout.text) > self.max_text:
+            draw.text(xy, text, font=layout.font, fill=fill)
+            return
+        self.get(text, layout.font_name, layout.font_size, layout.font).draw(draw, xy, fill)
+
+    def clear(self):
+        """Drop every sprite and reset the counters"""
+        with self._lock:
+            self._sprites.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Return hit/miss counts and current memory use"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._sprites),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_sprite_cache = None
+_sprite_cache_lock = threading.Lock()
+
+
+def get_sprite_cache():
+    """Return the process-wide text sprite cache"""
+    global _sprite_cache
+    with _sprite_cache_lock:
+        if _sprite_cache is None:
+            _sprite_cache = SpriteCache()
+        return _sprite_cache
+
+
+_metrics = OrderedDict()
+_metrics_lock = threading.Lock()
+MAX_METRICS = 64
+
+
+def get_metrics(font_name, size, font):
+    """Return the process-wide glyph metrics for a (font file, size)"""
+    key = (font_name, size)
+    with _metrics_lock:
+        metrics = _metrics.get(key)
+        if metrics is not None:
+            _metrics.move_to_end(key)
+            return metrics
+        metrics = GlyphMetrics(font)
+        _metrics[key] = metrics
+        while len(_metrics) > MAX_METRICS:
+            _metrics.popitem(last=False)
+        return metrics
+
+
+def clear_metrics():
+    """Drop every cached glyph metric, e.g. after a font file changed"""
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _split_word(word, metrics, max_width):
+    """Break a word that is wider than max_width into pieces that fit"""
+    pieces = []
+    current = ''
+    for char in word:
+        if current and metrics.width(current + char) > max_width:
+            pieces.append(current)
+            current = char
+        else:
+            current += char
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def break_lines(text, metrics, max_width):
+    """Greedily break text into [(line, width)] lines no wider than max_width"""
+    space = metrics.advance(' ')
+    lines = []
+    for paragraph in text.split('\n'):
+        line = ''
+        line_width = 0.0
+        for word in paragraph.split():
+            pieces = [word]
+            if metrics.width(word) > max_width:
+                pieces = _split_word(word, metrics, max_width)
+            for piece in pieces:
+                piece_width = metrics.width(piece)
+                if not line:
+                    line, line_width = piece, piece_width
+                    continue
+                joined = (line_width + space + piece_width
+                          + metrics.kerning(line[-1], ' ') + metrics.kerning(' ', piece[0]))
+                if joined <= max_width:
+                    line, line_width = f"{line} {piece}", joined
+                else:
+                    lines.append((line, line_width))
+                    line, line_width = piece, piece_width
+        if line:
+            lines.append((line, line_width))
+    return lines
+
+
+def ellipsize(line, metrics, max_width, ellipsis='…'):
+    """Cut a line short so that it ends in an ellipsis and still fits max_width"""
+    text = line.rstrip()
+    while text and metrics.width(text + ellipsis) > max_width:
+        text = text[:-1].rstrip()
+    text += ellipsis
+    return text, metrics.width(text)
+
+
+def fit_text(text, font_name, size, fonts, max_width, line_height=None, max_lines=None,
+             min_size=None, step=2, tracer=_NULL_TRACER, max_height=None):
+    """Fit text to max_width, shrinking the font until it fits in max_lines and max_height
+
+    fonts is a FontRegistry. line_height scales with the chosen size. Text that still does
+    not fit at min_size is cut after the last line that fits and ends in an ellipsis.
+    Returns a TextLayout.
+    """
+    base_size = size
+    base_line_height = line_height if line_height is not None else round(size * 1.4)
+    min_size = min_size or size
+    while True:
+        with tracer.span('font'):
+            font = fonts.get(font_name, size)
+        metrics = get_metrics(font_name, size, font)
+        lines = break_lines(text, metrics, max_width)
+        scaled_line_height = round(base_line_height * size / base_size)
+        allowed = len(lines)
+        if max_lines is not None:
+            allowed = min(allowed, max_lines)
+        if max_height is not None and scaled_line_height > 0:
+            allowed = min(allowed, max(1, max_height // scaled_line_height))
+        if allowed == len(lines) or size - step < min_size:
+            if allowed < len(lines):
+                lines = lines[:allowed]
+                lines[-1] = ellipsize(lines[-1][0], metrics, max_width)
+            return TextLayout(lines, font, size, scaled_line_height, font_name, text)
+        size -= step
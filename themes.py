@@ -0,0 +1,198 @@
+from collections.abc import Mapping
+import json
+import os
+import threading
+from types import MappingProxyType
+
+# Colors every registry theme defines; templates map their own color names onto these
+THEME_ROLES = (
+    'background',
+    'background_top',
+    'background_bottom',
+    'text',
+    'accent',
+    'highlight',
+    'progress',
+    'bar_track',
+)
+
+
+def parse_color(value, where='color'):
+    """Turn [r, g, b] or '#rrggbb' into an (r, g, b) tuple, raising ValueError if invalid"""
+    if isinstance(value, str):
+        text = value.lstrip('#')
+        if len(text) == 6:
+            try:
+                return tuple(int(text[i:i + 2], 16) for i in (0, 2, 4))
+            except ValueError:
+                pass
+        raise ValueError(f"Invalid color for {where}: {value!r}")
+    if (isinstance(value, (list, tuple)) and len(value) == 3
+            and all(isinstance(channel, int) and 0 <= channel <= 255 for channel in value)):
+        return tuple(value)
+    raise ValueError(f"Invalid color for {where}: {value!r}")
+
+
+class Palette(Mapping):
+    """An immutable, validated set of named (r, g, b) colors"""
+
+    __slots__ = ('name', '_colors', '_hash')
+
+    def __init__(self, name, colors):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, '_colors', MappingProxyType(
+            {key: parse_color(value, f"{name}.{key}") for key, value in colors.items()}))
+        object.__setattr__(self, '_hash', hash(tuple(sorted(self._colors.items()))))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Palettes are immutable")
+
+    def __getitem__(self, key):
+        try:
+            return self._colors[key]
+        except KeyError:
+            raise KeyError(f"Theme {self.name} has no color '{key}'") from None
+
+    def __iter__(self):
+        return iter(self._colors)
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, Palette):
+            return self._colors == other._colors
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Palette({self.name!r}, {dict(self._colors)!r})"
+
+    def select(self, keys, roles=None, name=None):
+        """Return a palette with the given color names, each taken from its role
+
+        roles maps a template's own color name to a theme role, e.g. {'character': 'highlight'}.
+        """
+        roles = roles or {}
+        return Palette(name or self.name,
+                       {key: self[roles.get(key, key)] for key in keys})
+
+
+class ThemeRegistry:
+    """Named palettes loaded from a JSON file, resolved and validated once
+
+    A theme lists a color for every role in THEME_ROLES, or "extends" another theme and
+    overrides some of them. "templates" adjusts single cover types in that theme only,
+    by the template's own color names, e.g. {"stoic_quote": {"accent": "#b4b4b4"}}.
+    Every palette is checked when it is registered, so a typo in the config fails at
+    startup rather than half way through a batch.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._palettes = {}
+        self._overrides = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def load(self, path):
+        """Add every theme from a JSON file of {"themes": {name: colors}}"""
+        with open(path, 'r', encoding='utf-8') as f:
+            themes = json.load(f).get('themes', {})
+        resolved = {}
+
+        def resolve(name, chain=()):
+            if name in resolved:
+                return resolved[name]
+            if name in chain:
+                raise ValueError(f"Theme {name} extends itself: {' -> '.join(chain + (name,))}")
+            colors = themes.get(name)
+            if colors is None:
+                palette = self._palettes.get(name)
+                if palette is None:
+                    raise ValueError(f"Unknown theme: {name}")
+                return dict(palette)
+            colors = dict(colors)
+            colors.pop('templates', None)
+            parent = colors.pop('extends', None)
+            if parent is not None:
+                colors = dict(resolve(parent, chain + (name,)), **colors)
+            resolved[name] = colors
+            return colors
+
+        palettes = {name: self._build(name, resolve(name)) for name in themes}
+        overrides = {(name, kind): Palette(f"{kind}:{name}", colors)
+                     for name, theme in themes.items()
+                     for kind, colors in theme.get('templates', {}).items()}
+        with self._lock:
+            self._palettes.update(palettes)
+            self._overrides.update(overrides)
+
+    def _build(self, name, colors):
+        missing = [role for role in THEME_ROLES if role not in colors]
+        if missing:
+            raise ValueError(f"Theme {name} is missing colors: {', '.join(missing)}")
+        unknown = sorted(set(colors) - set(THEME_ROLES))
+        if unknown:
+            raise ValueError(f"Theme {name} has unknown colors: {', '.join(unknown)}")
+        return Palette(name, colors)
+
+    def reload(self):
+        """Re-read the config file, dropping themes that were removed from it
+
+        The new themes are validated before any are replaced, so a broken edit keeps the
+        old ones in place.
+        """
+        fresh = ThemeRegistry(self.path)
+        with self._lock:
+            self._palettes = fresh._palettes
+            self._overrides = fresh._overrides
+
+    def register(self, name, colors, extends=None):
+        """Add or replace a theme, optionally based on an existing one"""
+        if extends is not None:
+            colors = dict(self.get(extends), **colors)
+        palette = self._build(name, colors)
+        with self._lock:
+            self._palettes[name] = palette
+        return palette
+
+    def names(self):
+        """Return the names of every registered theme"""
+        with self._lock:
+            return list(self._palettes)
+
+    def get(self, name):
+        """Return the palette of a theme, raising ValueError if it is unknown"""
+        with self._lock:
+            palette = self._palettes.get(name)
+        if palette is None:
+            raise ValueError(f"Unknown theme: {name}")
+        return palette
+
+    def overrides(self, name, kind):
+        """Return a theme's colors for one cover type, by the template's color names"""
+        with self._lock:
+            return self._overrides.get((name, kind), {})
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._palettes
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_theme_registry(path):
+    """Return the process-wide theme registry for a config file"""
+    path = os.path.abspath(path)
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = ThemeRegistry(path)
+            _registries[path] = registry
+        return registry
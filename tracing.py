@@ -0,0 +1,277 @@
+from collections import OrderedDict
+import itertools
+import json
+import os
+import threading
+import time
+
+_ids = itertools.count(1)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Span:
+    """A timed stage of a render, used as a context manager
+
+    Child spans inherit their parent's labels, so every stage of a render carries the
+    cover kind without repeating it at each call site.
+    """
+
+    __slots__ = ('tracer', 'name', 'labels', 'id', 'parent', 'start', 'seconds')
+
+    def __init__(self, tracer, name, labels):
+        self.tracer = tracer
+        self.name = name
+        self.labels = labels
+        self.id = None
+        self.parent = None
+        self.start = None
+        self.seconds = None
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.parent = stack[-1]
+            self.labels = dict(self.parent.labels, **self.labels)
+        self.id = next(_ids)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.seconds = time.perf_counter() - self.start
+        self.tracer._stack().pop()
+        self.tracer._finish(self, exc_type)
+        return False
+
+
+class _NullSpan:
+    """A span that records nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """The tracer used when tracing is off: spans and counters cost one method call
+
+    Events (such as 'saved') still reach listeners, so CLI output keeps working.
+    """
+
+    enabled = False
+
+    def __init__(self):
+        self.listeners = []
+
+    def span(self, name, **labels):
+        return _NULL_SPAN
+
+    def count(self, name, value=1, **labels):
+        pass
+
+    def add_collector(self, name, collector):
+        pass
+
+    def add_listener(self, listener):
+        """Call listener(event) for every event"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+        return listener
+
+    def remove_listener(self, listener):
+        """Stop sending events to a listener"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def event(self, event_type, /, **fields):
+        """Send a structured event such as 'saved' or 'span' to every listener"""
+        if self.listeners:
+            event = dict(fields, event=event_type, time=time.time())
+            for listener in self.listeners:
+                listener(event)
+
+
+class Tracer(NullTracer):
+    """Records per-stage spans, counters and gauges for renders and emits them as events
+
+    Span durations are aggregated per (name, labels) for export; with listeners attached
+    every finished span is also sent as a 'span' event.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        super().__init__()
+        self.counters = OrderedDict()
+        self.spans = OrderedDict()
+        self.gauges = OrderedDict()
+        self.collectors = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **labels):
+        """Return a context manager that times a stage"""
+        return Span(self, name, labels)
+
+    def _finish(self, span, exc_type):
+        key = (span.name, _label_key(span.labels))
+        with self._lock:
+            stats = self.spans.get(key)
+            if stats is None:
+                stats = self.spans[key] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += span.seconds
+            stats[2] = max(stats[2], span.seconds)
+        if self.listeners:
+            self.event('span', name=span.name, labels=span.labels,
+                       seconds=round(span.seconds, 6), span=span.id,
+                       parent=span.parent.id if span.parent else None,
+                       error=exc_type.__name__ if exc_type else None)
+
+    def count(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_collector(self, name, collector):
+        """Register collector() -> {metric: number}, read as gauges at export time"""
+        self.collectors[name] = collector
+
+    def collect(self):
+        """Return {(gauge name, labels): value} from every collector and merged snapshot"""
+        gauges = OrderedDict(self.gauges)
+        for name, collector in self.collectors.items():
+            for metric, value in collector().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    gauges[(f"{name}_{metric}", ())] = value
+        return gauges
+
+    def snapshot(self):
+        """Return the counters, spans and gauges as plain JSON-ready data"""
+        with self._lock:
+            counters = [[name, dict(labels), value]
+                        for (name, labels), value in self.counters.items()]
+            spans = [[name, dict(labels), count, total, peak]
+                     for (name, labels), (count, total, peak) in self.spans.items()]
+        gauges = [[name, dict(labels), value] for (name, labels), value in self.collect().items()]
+        return {'counters': counters, 'spans': spans, 'gauges': gauges}
+
+    def merge(self, snapshot, **labels):
+        """Add a snapshot from another tracer, e.g. one in a worker process
+
+        Gauges are current values, so they are stored per source under extra labels.
+        """
+        with self._lock:
+            for name, metric_labels, value in snapshot['counters']:
+                key = (name, _label_key(metric_labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for name, metric_labels, count, total, peak in snapshot['spans']:
+                key = (name, _label_key(metric_labels))
+                stats = self.spans.get(key)
+                if stats is None:
+                    stats = self.spans[key] = [0, 0.0, 0.0]
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], peak)
+            for name, metric_labels, value in snapshot['gauges']:
+                self.gauges[(name, _label_key(dict(metric_labels, **labels)))] = value
+
+    def reset(self):
+        """Forget every counter, span aggregate and merged gauge"""
+        with self._lock:
+            self.counters.clear()
+            self.spans.clear()
+            self.gauges.clear()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def prometheus_text(tracer, prefix='notion_covers'):
+    """Render a tracer's metrics in the Prometheus text exposition format"""
+    snapshot = tracer.snapshot()
+    lines = []
+
+    counters = OrderedDict()
+    for name, labels, value in snapshot['counters']:
+        counters.setdefault(name, []).append((labels, value))
+    for name, samples in counters.items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}_total{_format_labels(sorted(labels.items()))} {value}")
+
+    if snapshot['spans']:
+        metric = f"{prefix}_stage_seconds"
+        lines.append(f"# HELP {metric} Time spent in each render stage")
+        lines.append(f"# TYPE {metric} summary")
+        for name, labels, count, total, _ in snapshot['spans']:
+            label_text = _format_labels(sorted(dict(labels, stage=name).items()))
+            lines.append(f"{metric}_sum{label_text} {total:.6f}")
+            lines.append(f"{metric}_count{label_text} {count}")
+        lines.append(f"# TYPE {prefix}_stage_seconds_max gauge")
+        for name, labels, _, _, peak in snapshot['spans']:
+            label_text = _format_labels(sorted(dict(labels, stage=name).items()))
+            lines.append(f"{prefix}_stage_seconds_max{label_text} {peak:.6f}")
+
+    gauges = OrderedDict()
+    for name, labels, value in snapshot['gauges']:
+        gauges.setdefault(name, []).append((labels, value))
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{_format_labels(sorted(labels.items()))} {value}")
+    return '\n'.join(lines) + '\n'
+
+
+class JsonLinesExporter:
+    """Tracer listener that writes every event as one JSON line"""
+
+    def __init__(self, target):
+        if isinstance(target, (str, bytes, os.PathLike)):
+            self.stream = open(target, 'a', encoding='utf-8')
+            self._owned = True
+        else:
+            self.stream = target
+            self._owned = False
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def close(self):
+        """Close the output file if this exporter opened it"""
+        if self._owned:
+            self.stream.close()
+
+
+def print_saved(event):
+    """Tracer listener that prints the classic confirmation line for saved covers"""
+    if event['event'] == 'saved':
+        print(f"✓ {event['label']} image saved: {event['path']}")
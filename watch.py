@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Watch mode.
+Keeps output/ in sync with a directory of cover specs, re-rendering only the covers whose
+spec, data entry, template, fonts, theme or date changed since they were last written.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from batch import normalize_entry
+from image_generator import ImageGenerator
+from progress import today
+from render_cache import fingerprint_fonts
+
+MANIFEST_VERSION = 1
+
+
+def digest(value):
+    """Return a short, stable hash of a JSON-serializable value"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def load_specs(spec_dir):
+    """Return ({name: entry}, {name: error}) for every .json spec in a directory"""
+    specs = {}
+    errors = {}
+    if not os.path.isdir(spec_dir):
+        return specs, errors
+    for filename in sorted(os.listdir(spec_dir)):
+        name, extension = os.path.splitext(filename)
+        if extension != '.json':
+            continue
+        try:
+            with open(os.path.join(spec_dir, filename), 'r', encoding='utf-8') as f:
+                specs[name] = normalize_entry(json.load(f))
+        except (OSError, ValueError) as e:
+            errors[name] = f"{type(e).__name__}: {e}"
+    return specs, errors
+
+
+def stat_files(directory):
+    """Return (name, mtime, size) for every file in a directory, for change detection"""
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return ()
+    result = []
+    for name in names:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        result.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(result)
+
+
+def stat_file(path):
+    """Return (mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def check_filename(filename):
+    """Raise ValueError unless filename names a file directly inside the output directory"""
+    if (not isinstance(filename, str) or filename in ('', '.', '..')
+            or '/' in filename or '\\' in filename or os.path.isabs(filename)):
+        raise ValueError(f"filename must be a plain file name, got: {filename!r}")
+
+
+def write_atomic(path, data):
+    """Write bytes to a file so readers never see a half-written cover"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class CoverWatcher:
+    """Renders a directory of cover specs into output/, redoing only stale covers
+
+    Every spec file (one JSON manifest entry, e.g. {"generator": "year_progress",
+    "theme": "dark"}) becomes output/<spec name>.<ext>, or "filename" if the spec sets
+    one. For each cover the manifest records what it was drawn from: the spec, the resolved
+    inputs (the data entry, or the date for progress covers), the template, the font files,
+    the theme palette and the encoder. Quote and book specs keep the entry they picked
+    while it is still in the data file. A cover is re-rendered when any of them changes or
+    its file is missing. The manifest is kept on disk, so a restart rebuilds nothing that
+    is still current.
+    """
+
+    def __init__(self, spec_dir, generator=None, output_dir=None, manifest_path=None):
+        self.generator = generator or ImageGenerator(verbose=False)
+        self.spec_dir = spec_dir
+        self.output_dir = output_dir or self.generator.output_dir
+        self.manifest_path = manifest_path or os.path.join(
+            self.generator.base_dir, '.cache', 'watch.json')
+        self.manifest = self.load_manifest()
+        self._signature = None
+
+    def load_manifest(self):
+        """Read the manifest of rendered covers, or start an empty one"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = None
+        if not manifest or manifest.get('version') != MANIFEST_VERSION:
+            manifest = {'version': MANIFEST_VERSION, 'covers': {}}
+        return manifest
+
+    def save_manifest(self):
+        """Write the manifest atomically"""
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        write_atomic(self.manifest_path, json.dumps(self.manifest, indent=2).encode('utf-8'))
+
+    def resolve(self, name, entry):
+        """Return (cover, dependencies, output filename) for a spec without drawing it
+
+        cover['entry'] is the data entry the watcher picked for the spec, or None.
+        """
+        generator = self.generator
+        params = dict(entry['params'])
+        filename = params.pop('filename', None)
+        if filename is not None:
+            check_filename(filename)
+        picks = (generator.uses_data(entry['generator']) and 'seed' not in params
+                 and 'sample_index' not in params)
+        if picks:
+            params['seed'] = name
+        cover = generator.generate(entry['generator'], entry['theme'], output='inputs', **params)
+        if picks:
+            # Keep the entry picked last time while it is still in the data file, so
+            # adding or removing other entries never changes this cover
+            pinned = (self.manifest['covers'].get(name) or {}).get('entry')
+            if pinned is not None and generator.has_entry(cover['kind'], pinned,
+                                                          params.get('filters')):
+                cover['inputs'] = pinned
+        cover['format'] = params.get('format')
+        cover['entry'] = cover['inputs'] if picks else None
+
+        spec = generator.templates.get_spec(cover['kind'])
+        fonts = [tuple(font) for font in spec['fonts'].values()]
+        encoder = generator.get_encoder(cover['kind'], cover['format'])
+        dependencies = {
+            'spec': digest(entry),
+            'inputs': digest(cover['inputs']),
+            'template': digest(spec),
+            'fonts': digest(fingerprint_fonts(generator.fonts_dir, fonts)),
+            'theme': digest(dict(generator.templates.palette(cover['kind'], cover['theme']))),
+            'encoder': digest(encoder.describe()),
+        }
+        return cover, dependencies, filename or name + encoder.extension
+
+    def stale_reasons(self, name, dependencies, filename):
+        """Return why a cover must be rendered again, or [] if it is current"""
+        record = self.manifest['covers'].get(name)
+        if record is None:
+            return ['new']
+        reasons = [key for key, value in dependencies.items()
+                   if record['dependencies'].get(key) != value]
+        if record['output'] != filename or not os.path.exists(
+                os.path.join(self.output_dir, filename)):
+            reasons.append('output')
+        return reasons
+
+    def render(self, cover, filename):
+        """Draw a resolved cover and write it to the output directory"""
+        data = self.generator.generate_template(cover['kind'], cover['theme'], output='bytes',
+                                                format=cover['format'], **cover['inputs'])
+        path = os.path.join(self.output_dir, filename)
+        write_atomic(path, data)
+        return path
+
+    def remove_output(self, filename):
+        """Delete a cover this watcher wrote, returning its path if it existed"""
+        path = os.path.join(self.output_dir, filename)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def sync(self, force=False):
+        """Bring the output directory up to date with the specs
+
+        Returns {'rendered': [(name, path, reasons)], 'removed': [(name, path)],
+        'failed': [(name, error)], 'unchanged': count}.
+        """
+        specs, errors = load_specs(self.spec_dir)
+        covers = self.manifest['covers']
+        results = {'rendered': [], 'removed': [], 'failed': [], 'unchanged': 0}
+        changed = False
+
+        for name in sorted(set(covers) - set(specs) - set(errors)):
+            path = self.remove_output(covers.pop(name)['output'])
+            results['removed'].append((name, path))
+            changed = True
+
+        for name, entry in specs.items():
+            try:
+                cover, dependencies, filename = self.resolve(name, entry)
+                reasons = ['forced'] if force else self.stale_reasons(name, dependencies,
+                                                                     filename)
+                if not reasons:
+                    results['unchanged'] += 1
+                    if covers[name].get('entry') != cover['entry']:
+                        covers[name]['entry'] = cover['entry']
+                        changed = True
+                    continue
+                path = self.render(cover, filename)
+            except Exception as e:
+                results['failed'].append((name, f"{type(e).__name__}: {e}"))
+                continue
+            previous = covers.get(name)
+            if previous is not None and previous['output'] != filename:
+                self.remove_output(previous['output'])
+            covers[name] = {'output': filename, 'dependencies': dependencies,
+                            'entry': cover['entry'], 'rendered': time.time()}
+            results['rendered'].append((name, path, reasons))
+            changed = True
+
+        results['failed'].extend(sorted(errors.items()))
+        if changed:
+            self.save_manifest()
+        return results
+
+    def signature(self):
+        """Return (assets, inputs) snapshots of everything a cover can depend on
+
+        Only file times and sizes are read, plus today's date, so polling is cheap.
+        """
+        generator = self.generator
+        assets = (stat_files(generator.templates_dir), stat_files(generator.fonts_dir),
+                  stat_file(generator.themes.path))
+        outputs = tuple(stat_file(os.path.join(self.output_dir, record['output']))
+                        for record in self.manifest['covers'].values())
+        inputs = (stat_files(self.spec_dir), stat_files(generator.data_dir),
+                  today(generator.timezone), outputs)
+        return assets, inputs
+
+    def check(self):
+        """Sync if anything changed since the last check, returning the results or None"""
+        signature = self.signature()
+        if signature == self._signature:
+            return None
+        if self._signature is not None and signature[0] != self._signature[0]:
+            # Templates, fonts or themes were edited: drop every cache built from them
+            self.generator.reload()
+        results = self.sync()
+        self._signature = self.signature()
+        return results
+
+    def watch(self, interval=2.0, on_sync=None):
+        """Poll for changes forever, calling on_sync(results) after every sync"""
+        while True:
+            results = self.check()
+            if results is not None and on_sync is not None:
+                on_sync(results)
+            time.sleep(interval)
+
+
+def print_results(results):
+    """Print what a sync did"""
+    for name, path, reasons in results['rendered']:
+        print(f"✓ {name}: {path} ({', '.join(reasons)})")
+    for name, path in results['removed']:
+        print(f"🗑️  {name}: removed {path or 'nothing'}")
+    for name, error in results['failed']:
+        print(f"❌ {name}: {error}")
+    print(f"📊 {len(results['rendered'])} rendered, {results['unchanged']} unchanged, "
+          f"{len(results['removed'])} removed, {len(results['failed'])} failed")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Keep covers in sync with a directory of specs.")
+    parser.add_argument('spec_dir', nargs='?', default='covers',
+                        help="directory of .json cover specs (default: covers)")
+    parser.add_argument('--once', action='store_true', help="sync once and exit")
+    parser.add_argument('--force', action='store_true', help="re-render every cover once")
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="seconds between checks for changes (default: 2)")
+    parser.add_argument('--output-dir', help="where covers are written (default: output)")
+    parser.add_argument('--manifest', help="manifest file (default: .cache/watch.json)")
+    parser.add_argument('--timezone', help="time zone of progress covers, e.g. Europe/Berlin")
+    args = parser.parse_args(argv)
+
+    generator = ImageGenerator(verbose=False, timezone=args.timezone)
+    watcher = CoverWatcher(args.spec_dir, generator, args.output_dir, args.manifest)
+
+    if args.once or args.force:
+        results = watcher.sync(force=args.force)
+        print_results(results)
+        if args.once:
+            return 1 if results['failed'] else 0
+
+    print(f"👀 Watching {args.spec_dir} (Ctrl+C to stop)...")
+    try:
+        watcher.watch(args.interval, print_results)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Warm generators for render workers.
+The batch renderer, atlas export, HTTP server and daemon render on process or thread
+pools. Every worker builds one generator with its fonts pre-loaded when the pool starts
+and keeps it for its whole lifetime, so no render pays for loading them.
+"""
+
+from functools import partial
+
+_generator = None
+
+
+def init_worker(trace=None, tracer=None, **options):
+    """Build this worker's generator and pre-load its fonts
+
+    options are ImageGenerator arguments such as seed, encoder or render_cache. trace=True
+    gives the worker its own Tracer, and a path also appends its spans and events to that
+    JSON-lines file; a tracer is used as is.
+    """
+    global _generator
+    from image_generator import ImageGenerator
+    if trace:
+        from tracing import JsonLinesExporter, Tracer
+        tracer = Tracer()
+        if isinstance(trace, str):
+            tracer.add_listener(JsonLinesExporter(trace))
+    _generator = ImageGenerator(verbose=False, tracer=tracer, **options)
+    _generator.warm_fonts()
+
+
+def get_generator():
+    """Return this worker's generator, building a default one on first use"""
+    if _generator is None:
+        init_worker()
+    return _generator
+
+
+def initializer(**options):
+    """Return a picklable pool initializer that calls init_worker with options"""
+    return partial(init_worker, **options)
+
+
+def make_executor(kind, workers, **options):
+    """Return a 'process' or 'thread' executor whose workers render with a warm generator
+
+    Threads share one generator, which is safe because every cache it uses is locked.
+    """
+    import concurrent.futures
+    if kind == 'process':
+        return concurrent.futures.ProcessPoolExecutor(workers,
+                                                      initializer=initializer(**options))
+    if kind == 'thread':
+        init_worker(**options)
+        return concurrent.futures.ThreadPoolExecutor(workers)
+    raise ValueError(f"Unknown executor: {kind}")